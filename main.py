@@ -4,19 +4,30 @@ import Squardle.src.squardle_bot as SB
 import Squardle.src.squardle_solver as SS
 import Squardle.src.board_parser as BP
 import Squardle.src.get_leaderboard as GL
+import Squardle.src.rejected_words as RW
+import Squardle.src.exclusions as EX
+import Squardle.src.word_ranking as WR
+import Squardle.src.daemon as DM
+import Squardle.src.account_pool as AP
+import Squardle.src.api_client as AC
 import pathlib
+import sys
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from time import time,ctime
-import requests
 from Luca.logger import LucaLogger
 logger = LucaLogger(__file__)
 telegram_message = LucaLogger("Stats Message")
 
+CONCURRENT = True       #overlap the long solve and the browser setup with the quick pass (see bot)
+START_METHOD = "fork"   #start method of the long solve process. The daemon uses "spawn", since it forks while its own threads are running
+
 def init_LOG():
 
     PATH = pathlib.Path(__file__).parent.absolute()
     LOG_PATH = PATH.joinpath("Squaredle.log")
 
-    loggers = [logger,SB.logger,SS.logger,BP.logger,CH.logger]
+    loggers = [logger,SB.logger,SS.logger,BP.logger,CH.logger,GL.logger,RW.logger,EX.logger,WR.logger,DM.logger,AP.logger,AC.logger]
 
     #log_file init
     for l in loggers:
@@ -39,56 +50,221 @@ def ms_conv(timer:int, magnitude:int = 0):
     seconds = round((timer*magnitude)%60,2)
     return str(minutes)+":"+str(seconds)
     
-def result(uuid):
-    logger.debug("Request Sync of results")
-    url = "https://squaredle.app/api/index.php"
-    data = {"op":"requestSync","args":{"uuid":uuid,"game":"squaredle"}}
-    response= requests.post(url,json=data,timeout=100)
-    if not(response.ok):
-        logger.error("Not able to sync results")
-    sync_data = response.json()
+def submission_stats(stats:dict):
+    """Words/sec sent, accepted and rejected by SB.attempt"""
+    try:
+        return "{sent_rate:.1f} sent/s | {accepted_rate:.1f} accepted/s | {rejected_rate:.1f} rejected/s".format(**stats)
+    except:
+        return "n/a"
+
+def _today_results(sync_data:dict):
     todays_data = sync_data["data"]["newState"]["today"]
     found = len(todays_data["words"])
     bonuses = len(todays_data["optionalWords"])
     non_word = todays_data["nonWordCount"]
     puzzle_time = todays_data["ms"]
-    return found,bonuses,non_word,puzzle_time
-    
+    return found,bonuses,non_word,puzzle_time,todays_data
 
-def bot():
-    #quick solution of board
-    quick_start = time()
-    solution, bonus, invalid = SS.squardle_solver(quick_solution=True)
-    quick_time = int(time()-quick_start)
+def result(uuid):
+    logger.debug("Request Sync of results")
+    try:
+        sync_data = AC.client().api("requestSync", {"uuid":uuid,"game":"squaredle"})
+    except:
+        logger.error("Not able to sync results")
+        raise
+    return _today_results(sync_data)
+
+async def result_async(uuid):
+    """result, awaitable (see api_client.run)"""
+    logger.debug("Request Sync of results")
+    sync_data = await AC.client().api_async("requestSync", {"uuid":uuid,"game":"squaredle"})
+    return _today_results(sync_data)
     
-    #set up of driver
+
+def browser(credentials, driver = None):
+    """Signed in WebDriver on the board of the day: a new one, or the given one reloaded.
+
+    Returns:
+        tuple: driver, number of words of the board
+    """
+    if driver is None:
+        driver = SB.setup(_headless = True)
+        SB.cookies(driver)
+        SB.signin(driver,credentials)
+    else:
+        SB.reload(driver)
+    return driver, SB.max_word(driver)
+
+def _long_solve(setup, feed):
+    """Long pass of the solver, run in a child process: every word found is put on feed, then None"""
+    try:
+        words, bonus, invalid = SS.squardle_solver(quick_solution=False, stream=True, setup=setup)
+        for w in words:
+            feed.put(w)
+    except:
+        logger.error("Background long solve failed", exc_info=True)
+    finally:
+        feed.put(None)
+
+def long_solve_process(setup, stages:dict, start_method:str = START_METHOD):
+    """Start the long pass of the solver in a background daemon process.
+    Its exclusion doesn't need the words of the quick pass (they are all in the quick lists), so it starts before the quick pass.
+    The caller stops the process with stop_process if the words are not consumed to the end (e.g. the browser setup failed).
+
+    Args:
+        start_method (str, optional): multiprocessing start method. Defaults to START_METHOD.
+
+    Returns:
+        tuple: generator of the words of the long pass, as soon as the child process finds them (the wall time of the pass is stored in stages once exhausted), the process
+    """
+    start = time()
+    context = multiprocessing.get_context(start_method)
+    feed = context.Queue()
+    process = context.Process(target=_long_solve, args=(setup, feed), daemon=True)
+    process.start()
+    def words():
+        while True:
+            w = feed.get()
+            if w is None:
+                break
+            yield w
+        process.join()
+        stages["long solve"] = time()-start
+    return words(), process
+
+def stop_process(process):
+    """Terminate and join a long solve process still running"""
+    if process is not None and process.is_alive():
+        logger.warning("Long solve process stopped before the end")
+        process.terminate()
+    if process is not None:
+        process.join()
+
+def learn(setup):
+    """Learn from yesterday's solutions the words rejected and the words likely accepted.
+
+    Returns:
+        tuple: known rejected words (see rejected_words), ranking of the words or None (see word_ranking)
+    """
+    #learn the words rejected yesterday, and skip all known rejected words
+    try:
+        RW.update_from_previous_day(setup)
+    except:
+        logger.error("Unable to update rejected words from yesterday's solution", exc_info=True)
+    rejected = RW.load()
+
+    #learn from yesterday's solutions which words are likely accepted, and type those first
+    try:
+        WR.record_day(setup)
+        ranking = WR.load_ranking()
+    except:
+        logger.error("Word ranking not available", exc_info=True)
+        ranking = None
+    return rejected, ranking
+
+def stage_times(stages:dict):
+    """Wall time of every stage of bot"""
+    return " | ".join("{0} {1:.1f}s".format(name, seconds) for name, seconds in stages.items())
+
+def bot(concurrent = CONCURRENT, driver = None, word_lists = None, start_method = START_METHOD):
+    """Solve the board of the day and type the solutions.
+
+    Sequential: quick solve, browser setup, quick typing, long solve typed while it streams.
+    Concurrent: the long solve starts at once in a background process and the browser is set up in a thread while the quick pass is solved.
+    Every stage is joined only when its output is needed. If a stage fails the long solve process is stopped before the error is raised,
+    and a browser still being set up is waited for and closed (unless driver was given).
+
+    Args:
+        concurrent (bool, optional): Overlap the stages. Defaults to CONCURRENT.
+        driver (optional): Signed in WebDriver to reuse (see daemon), left open. Defaults to None, a new one is set up and closed.
+        word_lists (tuple, optional): quick and long dictionaries already open (see daemon), used by the passes solved in this process. Defaults to None, opened by the solver.
+        start_method (str, optional): start method of the long solve process (see long_solve_process). Defaults to START_METHOD.
+
+    Returns:
+        dict: wall time of every stage
+    """
+    bot_start = time()
+    stages = dict()
+    keep_driver = driver is not None
+
+    #puzzle config, shared by both passes
+    setup = BP.js_parser()
+    stages["setup"] = time()-bot_start
+
+    #long solution started first, and browser set up, while the quick solution is searched
     credentials = CH.getcredentials("SQUAREDLE")
-    driver = SB.setup(_headless = True)
-    SB.cookies(driver)
-    SB.signin(driver,credentials)
-    max_words = SB.max_word(driver)
-
-    #quick solution
-    first_attempt_start = time()
-    SB.attempt(driver= driver, words= solution, bonus_word= bonus, invalid_words =invalid)
-    first_attempt_time = int(time()-first_attempt_start)
-    
-    #get Timer of the game
-    message = "Timer: {0}".format(SB.getTime(driver))
-    logger.info(message)
-
-    #long solution
-    long_start = time()
-    long_solution, bonus, invalid = SS.squardle_solver(quick_solution=False, quick_list=solution)
-    long_time = int(time()-long_start)
-    second_attempt_start = time()
-    SB.attempt(driver= driver, words= long_solution, bonus_word= bonus, invalid_words= invalid)
-    second_attempt_time = int(time()-second_attempt_start)
+    long_process = pool = browser_ready = None
+    try:
+        if concurrent:
+            long_solution, long_process = long_solve_process(setup, stages, start_method)
+            pool = ThreadPoolExecutor(max_workers=1)
+            browser_start = time()
+            browser_ready = pool.submit(browser, credentials, driver)
+
+        rejected, ranking = learn(setup)
+
+        #quick solution of board
+        quick_start = time()
+        solution, bonus, invalid = SS.squardle_solver(quick_solution=True, setup=setup, word_lists=word_lists)
+        solution = list(RW.filter_words(solution, rejected))
+        quick_time = int(time()-quick_start)
+        stages["quick solve"] = time()-quick_start
+
+        #set up of driver
+        if concurrent:
+            driver, max_words = browser_ready.result()
+            browser_ready = None    #driver handed over, closed below
+            stages["browser"] = time()-browser_start
+        else:
+            browser_start = time()
+            driver, max_words = browser(credentials, driver)
+            stages["browser"] = time()-browser_start
+
+        #quick solution
+        first_attempt_start = time()
+        quick_stats = dict()
+        SB.attempt(driver= driver, words= solution, bonus_word= bonus, invalid_words =invalid, stats= quick_stats, ranking= ranking, threshold= WR.THRESHOLD)
+        first_attempt_time = int(time()-first_attempt_start)
+        stages["quick typing"] = time()-first_attempt_start
+
+        #get Timer of the game
+        message = "Timer: {0}".format(SB.getTime(driver))
+        logger.info(message)
+
+        #long solution, typed while the board is still being solved
+        long_start = time()
+        if not concurrent:
+            long_solution, bonus, invalid = SS.squardle_solver(quick_solution=False, quick_list=solution, stream=True, setup=setup, word_lists=word_lists)
+        long_time = int(time()-long_start)
+        second_attempt_start = time()
+        long_stats = dict()
+        long_solution_size = SB.attempt(driver= driver, words= RW.filter_words(long_solution, rejected), bonus_word= bonus, invalid_words= invalid, stats= long_stats, ranking= ranking, threshold= WR.THRESHOLD)
+        second_attempt_time = int(time()-second_attempt_start)
+        stages["long typing"] = time()-second_attempt_start
+        if concurrent:
+            long_time = int(stages.get("long solve", long_time))
+    finally:
+        stop_process(long_process)
+        if browser_ready is not None and not keep_driver:
+            try:
+                browser_ready.result()[0].quit()
+                logger.info("Browser of the failed run closed")
+            except:
+                logger.error("Unable to close the browser of the failed run", exc_info=True)
+        if pool is not None:
+            pool.shutdown(wait=False)
 
     #close driver
-    driver.close()
+    if not keep_driver:
+        driver.close()
+    stages["total"] = time()-bot_start
     
-    found_words, optional_words, non_words, puzzle_time = result(credentials["uuid"])
+    found_words, optional_words, non_words, puzzle_time, todays_data = result(credentials["uuid"])
+    try:
+        RW.record_submissions(setup[BP.TODAY], quick_stats.get("words", [])+long_stats.get("words", []))
+        RW.update_from_sync(setup[BP.TODAY], todays_data)
+    except:
+        logger.error("Unable to update rejected words", exc_info=True)
     puzzle_time = ms_conv(puzzle_time)
     
     message = """{date}
@@ -97,10 +273,13 @@ def bot():
     Number of Possible Words: {solution_size}
     Bonus Word: {bonus_word}
     Time Quick Exec: {quick_execution}|{quick_exec_min}
+    Quick Submission: {quick_submission}
     Timer: {timer_message}
     Time Long Solution: {long_solver}|{long_min}
     Number of Possible Words: {long_solution_size}
     Time Long Exec: {long_execution}|{long_exec_min}
+    Long Submission: {long_submission}
+    Stages: {stages}
     Result:
         Found Words: {result_valid}/{target_words}
         Found Bonus Words: {result_bonus}
@@ -113,12 +292,15 @@ def bot():
                                              bonus_word = bonus,
                                              quick_execution = first_attempt_time,
                                              quick_exec_min = ms_conv(first_attempt_time),
+                                             quick_submission = submission_stats(quick_stats),
                                              timer_message = message,
                                              long_solver = long_time,
                                              long_min = ms_conv(long_time),
-                                             long_solution_size = len(long_solution),
+                                             long_solution_size = long_solution_size,
                                              long_execution = second_attempt_time,
                                              long_exec_min = ms_conv(second_attempt_time),
+                                             long_submission = submission_stats(long_stats),
+                                             stages = stage_times(stages),
                                              result_valid = found_words,
                                              result_bonus = optional_words,
                                              result_invalid = non_words,
@@ -126,11 +308,112 @@ def bot():
                                              target_words = max_words
                                              )
     telegram_message.critical(message)
+    return stages
+
+def multi_bot():
+    """Solve the board once and type the solution on every SQUAREDLE account (see credential_handler.getaccounts),
+    on a pool of browsers bounded by the memory available (see account_pool). The results of every account are synced and sent in one message.
+
+    Returns:
+        dict: wall time of every stage
+    """
+    bot_start = time()
+    stages = dict()
+    setup = BP.js_parser()
+    stages["setup"] = time()-bot_start
+
+    #long solution started first, quick solution searched meanwhile
+    long_solution, long_process = long_solve_process(setup, stages)
+    try:
+        rejected, ranking = learn(setup)
+        quick_start = time()
+        solution, bonus, invalid = SS.squardle_solver(quick_solution=True, setup=setup)
+        stages["quick solve"] = time()-quick_start
+        words = list(RW.filter_words(solution, rejected))
+        words += RW.filter_words(long_solution, rejected)
+    finally:
+        stop_process(long_process)
+
+    #same words on every account
+    accounts = CH.getaccounts("SQUAREDLE")
+    typing_start = time()
+    results = AP.fan_out(accounts, words, bonus, invalid, ranking= ranking, threshold= WR.THRESHOLD)
+    stages["typing"] = time()-typing_start
+    stages["total"] = time()-bot_start
+
+    #submissions recorded before any sync, so every update_from_sync compares the accepted words against them
+    try:
+        RW.record_submissions(setup[BP.TODAY], set().union(*[stats.get("words", []) for stats in results if stats is not None]))
+    except:
+        logger.error("Unable to record submissions", exc_info=True)
+
+    #results of every account synced concurrently
+    played = [(credentials, stats) for credentials, stats in zip(accounts, results) if stats is not None]
+    syncs = AC.run(*[result_async(credentials["uuid"]) for credentials, stats in played], return_exceptions=True)
+    lines = ["{0}: failed".format(credentials.get("username")) for credentials, stats in zip(accounts, results) if stats is None]
+    totals = [0, 0, 0]
+    for (credentials, stats), sync in zip(played, syncs):
+        if isinstance(sync, Exception):
+            message = "Unable to sync results of {0}: {1!r}".format(credentials.get("username"), sync)
+            logger.error(message)
+            lines.append("{0}: typed {1} words, results not available".format(credentials.get("username"), len(stats.get("words", []))))
+            continue
+        found_words, optional_words, non_words, puzzle_time, todays_data = sync
+        try:
+            RW.update_from_sync(setup[BP.TODAY], todays_data)
+        except:
+            logger.error("Unable to update rejected words", exc_info=True)
+        for i, count in enumerate((found_words, optional_words, non_words)):
+            totals[i] += count
+        lines.append("{0}: {1}/{2} words | {3} bonus | {4} invalid | {5} | session {6:.1f}s".format(credentials.get("username"), found_words, stats.get("max_words"),
+                                                                                                    optional_words, non_words, ms_conv(puzzle_time), stats["session"]))
+
+    message = """{date}
+    Accounts: {played}/{accounts}
+    Number of Possible Words: {solution_size}
+    Bonus Word: {bonus_word}
+    Stages: {stages}
+    Result:
+        {lines}
+        Total: {found} words | {bonuses} bonus | {invalid} invalid""".format(date = ctime(),
+                                                                           played = len(played),
+                                                                           accounts = len(accounts),
+                                                                           solution_size = len(words),
+                                                                           bonus_word = bonus,
+                                                                           stages = stage_times(stages),
+                                                                           lines = "\n        ".join(lines),
+                                                                           found = totals[0],
+                                                                           bonuses = totals[1],
+                                                                           invalid = totals[2])
+    telegram_message.critical(message)
+    return stages
 
-def get_leadrboard():pass
+def get_leadrboard(days:int = 2):
+    """Refresh the leaderboards of the last days in the local store (see get_leaderboard) and send our rank over time"""
+    setup = BP.js_parser()
+    credentials = CH.getcredentials("SQUAREDLE")
+    #puzzle ids compared as dates, not as text (see board_parser.DATE_FORMATS)
+    today = BP.parse_date(setup[BP.TODAY])
+    dated = [(BP.parse_date(p), p) for p in setup[BP.PUZZLE]["puzzles"]]
+    puzzles = [p for day, p in sorted(d for d in dated if d[0] is not None and (today is None or d[0] <= today))][-days:]
+    GL.refresh(puzzles, credentials["uuid"], today=setup[BP.TODAY])
+    history = GL.rank_history(credentials["uuid"]) or GL.rank_history(credentials["username"])
+    message = "Rank of {0}:\n    {1}".format(credentials["username"], "\n    ".join("{0}: {1}/{3} ({2})".format(*row) for row in history))
+    telegram_message.critical(message)
+    return history
 
 def main():
-    bot()
+    #--daemon: keep running and play every new board on a warm browser (see daemon)
+    #--accounts: solve once and play every account (see multi_bot)
+    #--leaderboard: store the latest leaderboards and send our rank (see get_leadrboard)
+    if "--daemon" in sys.argv:
+        DM.Daemon(run=bot).serve()
+    elif "--accounts" in sys.argv:
+        multi_bot()
+    elif "--leaderboard" in sys.argv:
+        get_leadrboard()
+    else:
+        bot()
 
 if __name__ == "__main__":
     init_LOG()
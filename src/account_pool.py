@@ -0,0 +1,93 @@
+""" Module types one solution on several Squaredle accounts at once, each on its own headless Firefox session.
+The number of browsers open at the same time is bounded by the memory available (see browser_limit), since every Firefox costs BROWSER_MEMORY.
+    """
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+import Squardle.src.squardle_bot as SB
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+BROWSER_MEMORY = 350*1024*1024      #bytes of a headless Firefox playing the board
+MEMORY_RESERVE = 256*1024*1024      #bytes left to the system and the bot
+MAX_BROWSERS = 4                    #browsers at once, whatever the memory
+
+def available_memory():
+    """Bytes of memory available to new processes, None if unknown"""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1])*1024
+    except:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES")*os.sysconf("SC_PAGE_SIZE")
+    except:
+        return None
+
+def browser_limit(accounts:int, max_browsers:int = MAX_BROWSERS):
+    """Number of browsers that can be open at once for accounts, at least one.
+
+    Returns:
+        int: browsers at once
+    """
+    memory = available_memory()
+    limit = min(accounts, max_browsers)
+    if memory is not None:
+        limit = min(limit, (memory-MEMORY_RESERVE)//BROWSER_MEMORY)
+    message = "Browsers at once: {0} for {1} accounts ({2} MB available)".format(max(limit, 1), accounts, memory//2**20 if memory else "?")
+    logger.info(message)
+    return max(limit, 1)
+
+def play_account(credentials:dict, words:list, bonus_word:str, invalid_words, ranking = None, threshold:float = 0.0):
+    """Set up a browser, sign in the account and type the words (see squardle_bot.attempt).
+
+    Returns:
+        dict: stats of the submission, with the elapsed seconds of the whole session ("session") and the number of words of the board ("max_words")
+    """
+    start = time()
+    stats = dict()
+    driver = SB.setup(_headless = True)
+    if driver is None:
+        raise RuntimeError("WebDriver not connected")
+    try:
+        SB.cookies(driver)
+        SB.signin(driver, credentials)
+        stats["max_words"] = SB.max_word(driver)
+        SB.attempt(driver= driver, words= words, bonus_word= bonus_word, invalid_words= invalid_words, stats= stats, ranking= ranking, threshold= threshold)
+    finally:
+        driver.quit()
+    stats["session"] = time()-start
+    message = "{0}: {1} words typed in {2:.1f}s".format(credentials.get("username", credentials.get("email")), len(stats.get("words", [])), stats["session"])
+    logger.info(message)
+    return stats
+
+def fan_out(accounts:list, words:list, bonus_word:str, invalid_words, ranking = None, threshold:float = 0.0, max_browsers:int = MAX_BROWSERS):
+    """Type the same words on every account, with a bounded pool of browsers.
+
+    Args:
+        accounts (list): credentials of the accounts (see credential_handler.getaccounts)
+        words (list): words to type, already solved
+        bonus_word (str): bonus word of the day, typed last
+        invalid_words: words not to type
+        ranking (optional): order of the words (see word_ranking). Defaults to None.
+        threshold (float, optional): words ranked below are not typed. Defaults to 0.0.
+        max_browsers (int, optional): browsers at once, lowered to fit the memory available. Defaults to MAX_BROWSERS.
+
+    Returns:
+        list: stats of each account (see play_account), None for the accounts that failed
+    """
+    if not accounts:
+        return []
+    with ThreadPoolExecutor(max_workers=browser_limit(len(accounts), max_browsers)) as pool:
+        sessions = [pool.submit(play_account, credentials, words, bonus_word, invalid_words, ranking, threshold) for credentials in accounts]
+    results = []
+    for credentials, session in zip(accounts, sessions):
+        try:
+            results.append(session.result())
+        except:
+            message = "Account {0} failed".format(credentials.get("username", credentials.get("email")))
+            logger.error(message, exc_info=True)
+            results.append(None)
+    return results
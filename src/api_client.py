@@ -0,0 +1,187 @@
+""" Module is the HTTP client of the squaredle.app API, shared by every call of the bot.
+A single keep-alive session is reused, so calls after the first skip the connection and TLS handshake.
+Failed connections and RETRY_STATUS answers of GET and HEAD are retried up to RETRIES times with exponential backoff (BACKOFF, 2*BACKOFF, ...), honouring Retry-After.
+POSTs are not retried, since the operation may have run, except the read-only operations of SAFE_OPS.
+Every call has an asyncio version, so independent calls (config, sync, leaderboard) can run concurrently (see run).
+
+The base url is taken from the environment variable BASE_URL_ENV if set, or changed with configure, e.g. to test against a local stub server:
+    configure(base_url="http://127.0.0.1:8000/")
+Running the module checks the client against such a stub server (see _stub_check).
+    """
+import asyncio
+import functools
+import json
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+BASE_URL = "https://squaredle.app/api/"
+BASE_URL_ENV = "SQUAREDLE_API_URL"         #environment variable overriding BASE_URL
+API_PATH = "index.php"                      #operations of the api, as {"op": ..., "args": ...}
+CONFIG_PATH = "today-puzzle-config.js"      #puzzle config of the day (see board_parser)
+
+TIMEOUT = (5, 30)       #seconds to connect, seconds to read
+RETRIES = 3             #retries of a call, after the first attempt
+BACKOFF = 0.5           #seconds before the first retry, doubled at every retry
+RETRY_STATUS = (429, 500, 502, 503, 504)
+POOL_SIZE = 8           #connections kept alive, one per concurrent call
+SAFE_OPS = ("getLeaderboardScores",)        #operations of the api that only read, retried like a GET
+
+class ApiClient:
+    """Keep-alive session to the api, with retries.
+
+    Args:
+        base_url (str, optional): url the paths are relative to. Defaults to the environment variable BASE_URL_ENV, else BASE_URL.
+        timeout (tuple, optional): seconds to connect and to read. Defaults to TIMEOUT.
+        retries (int, optional): retries of a call. Defaults to RETRIES.
+        backoff (float, optional): seconds before the first retry. Defaults to BACKOFF.
+    """
+
+    def __init__(self, base_url:str = None, timeout = TIMEOUT, retries:int = RETRIES, backoff:float = BACKOFF):
+        base_url = base_url or os.environ.get(BASE_URL_ENV) or BASE_URL
+        self.base_url = base_url if base_url.endswith("/") else base_url+"/"
+        self.timeout = timeout
+        self.session = self._session(Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUS, allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False))
+        self.safe_session = self._session(Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUS, allowed_methods=frozenset({"GET", "HEAD", "POST"}), raise_on_status=False))
+
+    def _session(self, retry:Retry):
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def url(self, path:str):
+        """Absolute url of a path of the api"""
+        return path if "://" in path else self.base_url+path.lstrip("/")
+
+    def get(self, path:str, **kwargs):
+        """GET a path of the api. Returns the requests.Response"""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(self.url(path), **kwargs)
+
+    def post(self, path:str, safe:bool = False, **kwargs):
+        """POST to a path of the api, retried only if safe (the request only reads). Returns the requests.Response"""
+        kwargs.setdefault("timeout", self.timeout)
+        return (self.safe_session if safe else self.session).post(self.url(path), **kwargs)
+
+    def api(self, op:str, args:dict):
+        """Call an operation of the api. Only the operations of SAFE_OPS are retried.
+
+        Raises:
+            requests.HTTPError: if the answer is not successful
+
+        Returns:
+            json of the answer
+        """
+        response = self.post(API_PATH, safe=op in SAFE_OPS, json={"op": op, "args": args})
+        response.raise_for_status()
+        return response.json()
+
+    async def _in_thread(self, call, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(call, *args, **kwargs))
+
+    async def get_async(self, path:str, **kwargs):
+        """get, awaitable"""
+        return await self._in_thread(self.get, path, **kwargs)
+
+    async def post_async(self, path:str, **kwargs):
+        """post, awaitable"""
+        return await self._in_thread(self.post, path, **kwargs)
+
+    async def api_async(self, op:str, args:dict):
+        """api, awaitable"""
+        return await self._in_thread(self.api, op, args)
+
+    def close(self):
+        self.session.close()
+        self.safe_session.close()
+
+_CLIENT = None
+_LOCK = threading.Lock()
+
+def client():
+    """Client shared by the whole bot, created on first use"""
+    global _CLIENT
+    with _LOCK:
+        if _CLIENT is None:
+            _CLIENT = ApiClient()
+        return _CLIENT
+
+def configure(**options):
+    """Replace the shared client with one built with options (see ApiClient)"""
+    global _CLIENT
+    with _LOCK:
+        if _CLIENT is not None:
+            _CLIENT.close()
+        _CLIENT = ApiClient(**options)
+        return _CLIENT
+
+def run(*calls, return_exceptions:bool = False):
+    """Run awaitable calls of the client concurrently, from synchronous code.
+
+    Args:
+        calls: awaitables, e.g. client().api_async(...)
+        return_exceptions (bool, optional): return the exception of a failed call in place of its result, else raise it. Defaults to False.
+
+    Returns:
+        list: results of the calls, in order
+    """
+    async def gather():
+        return await asyncio.gather(*calls, return_exceptions=return_exceptions)
+    return asyncio.run(gather())
+
+def _stub_check():
+    """Call the api through the shared client against a local stub server: the config is fetched, a safe operation is retried after a 503,
+    an unsafe one is not. Returns True if the client behaved as expected."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    calls = []
+
+    class Stub(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def answer(self, status:int, body:bytes):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            calls.append(("GET", self.path))
+            self.answer(200, b"var gTodayDateStr = '2026-01-01';")
+
+        def do_POST(self):
+            op = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["op"]
+            calls.append(("POST", op))
+            first = sum(1 for c in calls if c == ("POST", op)) == 1
+            self.answer(503 if first else 200, b'{"ok": true}')
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        stub = configure(base_url="http://127.0.0.1:{0}/".format(server.server_port), backoff=0)
+        config = stub.get(CONFIG_PATH).text
+        safe = stub.api(SAFE_OPS[0], dict())
+        try:
+            stub.api("requestSync", dict())
+            unsafe = "retried"
+        except requests.HTTPError:
+            unsafe = "not retried"
+    finally:
+        server.shutdown()
+        server.server_close()
+        configure()
+    message = "Stub server: config {0!r}, {1} answered {2} after {3} calls, requestSync {4}".format(config, SAFE_OPS[0], safe, calls.count(("POST", SAFE_OPS[0])), unsafe)
+    logger.info(message)
+    return "gTodayDateStr" in config and safe == {"ok": True} and unsafe == "not retried"
+
+if __name__ == "__main__":
+    logger.new_stream()
+    logger.setLevel("INFO")
+    print("OK" if _stub_check() else "FAILED")
@@ -0,0 +1,226 @@
+""" Module measures the performance of the solver on synthetic boards.
+Boards are random but seeded, so runs can be compared with each other.
+The suite (see run_suite) times every stage of the solver on square boards of SIZES and on waffle boards, against each dictionary of DICTIONARIES.
+Results are saved as JSON in RESULTS_PATH, and a run is compared against a previous one to spot regressions (see compare).
+    """
+import json
+import os
+import pathlib
+import platform
+import random
+import sys
+import tracemalloc
+from time import perf_counter, strftime
+import Squardle.src.squardle_solver as SS
+import Squardle.src.dawg as DG
+try:
+    import resource
+except ImportError:
+    resource = None     #not on Windows, resident memory not measured
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+#relative frequency of the letters in english words, to get boards with a realistic number of words
+LETTER_WEIGHTS = {"a":8.2,"b":1.5,"c":2.8,"d":4.3,"e":12.7,"f":2.2,"g":2.0,"h":6.1,"i":7.0,"j":0.2,"k":0.8,"l":4.0,"m":2.4,
+                  "n":6.7,"o":7.5,"p":1.9,"q":0.1,"r":6.0,"s":6.3,"t":9.1,"u":2.8,"v":1.0,"w":2.4,"x":0.2,"y":2.0,"z":0.1}
+
+PATH = pathlib.Path(__file__).parent.parent.absolute()
+RESULTS_PATH = PATH.joinpath("assets").joinpath("cache").joinpath("benchmarks")
+SIZES = range(3,11)         #sides of the square boards, 3x3 through 10x10
+WAFFLE_SIZES = (5,7,9)      #sides of the waffle boards
+DICTIONARIES = {"quick": {"mill_list": False}, "full": {"list1": False, "json_l": False, "mill_list": True}}     #arguments of dictionary_maker
+REGRESSION = 0.2            #relative slowdown of a stage reported as regression
+STAGES = ("matrix_time", "compile_time", "index_time", "search_time")
+
+def random_board(size:int, seed:int = 0):
+    """Seeded random square board of side size, as list of strings (the rows)"""
+    rng = random.Random(seed)
+    letters = rng.choices(list(LETTER_WEIGHTS), weights=list(LETTER_WEIGHTS.values()), k=size*size)
+    return ["".join(letters[r*size:(r+1)*size]) for r in range(size)]
+
+def waffle_board(size:int, seed:int = 0):
+    """Seeded random waffle board of side size: the cells of odd row and odd column are empty"""
+    board = random_board(size, seed)
+    return ["".join(" " if r%2 and c%2 else l for c,l in enumerate(row)) for r,row in enumerate(board)]
+
+def count_nodes(graph:tuple, index):
+    """Number of nodes visited by the search of the board: the paths of cells walked in the index, as trace_words walks them"""
+    letters, adjacency = graph
+    nodes = 0
+    for start in range(len(letters)):
+        node = index.get(letters[start])
+        if node is None:
+            continue
+        nodes += 1
+        stack = [(start, node, 1 << start)]
+        while stack:
+            cell, node, visited = stack.pop()
+            for following in adjacency[cell]:
+                child = node.get(letters[following])
+                if child is not None and not visited >> following & 1:
+                    nodes += 1
+                    stack.append((following, child, visited | 1 << following))
+    return nodes
+
+def _measure(memory:bool, call, *args):
+    """Result, seconds and peak bytes allocated (0 if not memory) of a call. Memory is traced in a second call, not to slow down the timed one."""
+    start = perf_counter()
+    result = call(*args)
+    elapsed = perf_counter()-start
+    peak = 0
+    if memory:
+        tracemalloc.start()
+        call(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def _peak_rss():
+    """Peak resident set size of the process in bytes, 0 if not available. Unlike tracemalloc it counts the pages of memory mapped files read"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak*1024      #bytes on macOS, kilobytes elsewhere
+
+def benchmark_board(name:str, board:list, dictionary, memory:bool = True):
+    """Time each stage of the solver on a board: make_matrix, compile_board, index (pruning and trie) and search.
+
+    Returns:
+        dict: times, words found, nodes visited, throughput and peak memory of the board
+    """
+    matrix, matrix_time, matrix_memory = _measure(memory, SS.make_matrix, board)
+    graph, compile_time, compile_memory = _measure(memory, SS.compile_board, matrix)
+    index, index_time, index_memory = _measure(memory, lambda: SS.make_index(SS.prune_dictionary(matrix, dictionary)[0]))
+    words, search_time, search_memory = _measure(memory, lambda: SS.search_words(graph, index, set()))
+    nodes = count_nodes(graph, index)
+    result = {"board": name, "rows": board, "cells": sum(l != " " for l in graph[0]),
+              "matrix_time": matrix_time, "compile_time": compile_time, "index_time": index_time, "search_time": search_time,
+              "words": len(words), "nodes": nodes,
+              "words_per_sec": len(words)/max(search_time, 1e-9), "nodes_per_sec": nodes/max(search_time, 1e-9),
+              "peak_memory": max(matrix_memory, compile_memory, index_memory, search_memory)}
+    message = "{board}: {words} words | {nodes} nodes | index {index_time:.3f}s | search {search_time:.3f}s | {nodes_per_sec:.0f} nodes/s | peak {peak_memory} B".format(**result)
+    logger.info(message)
+    return result
+
+def run_suite(sizes = SIZES, waffle_sizes = WAFFLE_SIZES, seed:int = 0, dictionaries:dict = DICTIONARIES, memory:bool = True):
+    """Benchmark the solver on seeded random square and waffle boards, against each dictionary.
+
+    Args:
+        sizes (iterable, optional): sides of the square boards. Defaults to SIZES.
+        waffle_sizes (iterable, optional): sides of the waffle boards. Defaults to WAFFLE_SIZES.
+        seed (int, optional): seed of the boards. Defaults to 0.
+        dictionaries (dict, optional): name: arguments of dictionary_maker. Defaults to DICTIONARIES.
+        memory (bool, optional): trace the peak memory of every stage of the boards (runs it twice). Defaults to True.
+
+    Returns:
+        dict: "meta" of the run, "dictionaries": name: load time, words, growth of the peak resident memory while loading (see _peak_rss) and bytes as list and as automaton (see dawg.memory_comparison),
+            "boards": name of dictionary: list of results (see benchmark_board)
+    """
+    boards = [("{0}x{0}".format(size), random_board(size, seed)) for size in sizes]
+    boards += [("waffle {0}x{0}".format(size), waffle_board(size, seed)) for size in waffle_sizes]
+    results = {"meta": {"date": strftime("%Y-%m-%d %H:%M:%S"), "seed": seed, "python": platform.python_version(), "machine": platform.machine(),
+                        "cpus": os.cpu_count(), "numpy": SS.WM is not None},
+               "dictionaries": dict(), "boards": dict()}
+    for name, arguments in dictionaries.items():
+        #resident memory of the first load, the one that may compile the artifact: a second call only maps it again. 0 if it stays below an earlier peak
+        rss = _peak_rss()
+        start = perf_counter()
+        dictionary = SS.dictionary_maker(**arguments)
+        load_time = perf_counter()-start
+        results["dictionaries"][name] = {"load_time": load_time, "words": len(dictionary), "rss_growth": _peak_rss()-rss}
+        if not len(dictionary):
+            message = "Dictionary {0} not available, skipped".format(name)
+            logger.warning(message)
+            continue
+        try:
+            list_bytes, dawg_bytes = DG.memory_comparison(dictionary, DG.load_dawg(**arguments))
+            results["dictionaries"][name].update(list_bytes=list_bytes, dawg_bytes=dawg_bytes)
+        except:
+            message = "Automaton of dictionary {0} not measured".format(name)
+            logger.warning(message, exc_info=True)
+        results["boards"][name] = [benchmark_board(board_name, board, dictionary, memory) for board_name, board in boards]
+    return results
+
+def save_results(results:dict, path = None):
+    """Save the results of run_suite as JSON, by default in RESULTS_PATH named by date. Returns the path"""
+    if path is None:
+        RESULTS_PATH.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_PATH.joinpath("{0}.json".format(results["meta"]["date"].replace(" ", "_").replace(":", "")))
+    with open(path, "w") as f:
+        json.dump(results, f, indent=1)
+    return path
+
+def load_results(path = None):
+    """Results saved by save_results, by default the latest in RESULTS_PATH. None if there are none"""
+    if path is None:
+        saved = sorted(RESULTS_PATH.glob("*.json"))
+        if not saved:
+            return None
+        path = saved[-1]
+    with open(path, "r") as f:
+        return json.load(f)
+
+def compare(old:dict, new:dict, tolerance:float = REGRESSION):
+    """Regressions of a run against a previous one: stages slower by more than tolerance, and boards where a different number of words was found.
+
+    Returns:
+        list: (dictionary, board, measure, old value, new value)
+    """
+    regressions = []
+    for name, boards in new["boards"].items():
+        previous = {b["board"]: b for b in old.get("boards", dict()).get(name, [])}
+        for board in boards:
+            before = previous.get(board["board"])
+            if before is None:
+                continue
+            if before["words"] != board["words"]:
+                regressions.append((name, board["board"], "words", before["words"], board["words"]))
+            for stage in STAGES:
+                if board[stage] > before[stage]*(1+tolerance) and board[stage]-before[stage] > 1e-3:
+                    regressions.append((name, board["board"], stage, before[stage], board[stage]))
+    for regression in regressions:
+        message = "Regression on {1} with {0} dictionary, {2}: {3:.4g} -> {4:.4g}".format(*regression)
+        logger.warning(message)
+    return regressions
+
+def parallel_speedup(sizes = range(4,9), workers:int = SS.WORKERS, seed:int = 0, quick_solution = True):
+    """Time the single process solver against the parallel one on random boards.
+
+    Args:
+        sizes (iterable, optional): sides of the boards. Defaults to 4x4 through 8x8.
+        workers (int, optional): processes of the parallel solver. Defaults to SS.WORKERS.
+        seed (int, optional): seed of the boards. Defaults to 0.
+        quick_solution (bool, optional): dictionary of the quick solve, else the full one. Defaults to True.
+
+    Returns:
+        dict: side of the board: (serial time, parallel time, speedup)
+    """
+    if quick_solution:
+        index = SS.make_index(SS.dictionary_maker(mill_list=False))
+    else:
+        index = SS.make_index(SS.dictionary_maker(list1=False, json_l=False, mill_list=True))
+    results = dict()
+    for size in sizes:
+        graph = SS.compile_board(SS.make_matrix(random_board(size, seed)))
+        start = perf_counter()
+        serial = SS.search_words(graph, index, set())
+        serial_time = perf_counter()-start
+        start = perf_counter()
+        parallel = SS.parallel_search(graph, index, workers)
+        parallel_time = perf_counter()-start
+        if serial != parallel:
+            logger.error("Parallel solver found different words on board {0}x{0}".format(size))
+        results[size] = (serial_time, parallel_time, serial_time/parallel_time)
+        message = "{0}x{0}: {1} words | serial {2:.3f}s | {3} workers {4:.3f}s | speedup {5:.2f}".format(size, len(serial), serial_time, workers, parallel_time, serial_time/parallel_time)
+        logger.info(message)
+    return results
+
+if __name__ == "__main__":
+    logger.new_stream()
+    logger.setLevel("INFO")
+    previous = load_results()
+    results = run_suite()
+    message = "Results saved in {0}".format(save_results(results))
+    logger.info(message)
+    if previous is not None:
+        compare(previous, results)
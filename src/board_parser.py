@@ -2,7 +2,10 @@
 Other information you can access are the current and previous date, the current and previous puzzle configuration, solution to the previous puzzle, and stats of played puzzles.
     """
 import json
-import requests
+import pathlib
+import re
+from datetime import date, datetime
+import Squardle.src.api_client as AC
 from Luca.logger import LucaLogger
 logger = LucaLogger(__name__)
 
@@ -11,6 +14,16 @@ TODAY = "gTodayDateStr"
 YESTERDAY = "gYesterdayDateStr"
 PREVIOUS_DAY_WORDS = "gYesterdayWords"
 
+PATH = pathlib.Path(__file__).parent.parent.absolute()
+CONFIG_PATH = PATH.joinpath("assets").joinpath("cache").joinpath("configs")
+META = "latest.meta.json"        #date and validators of the last config downloaded
+DECLARATION = re.compile(r"\b(?:var|let|const)\s+([A-Za-z_$][\w$]*)\s*=")
+TOKEN = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`|[()\[\]{};,]")    #strings, brackets, semicolons and commas
+CONTINUATION = re.compile(r"\s*([A-Za-z_$][\w$]*)\s*=(?!=)")          #declaration following a comma
+JS_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|.)", re.S)   #escape sequence of a javascript string
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d")        #formats of gTodayDateStr
+
 def string_clean(sequence):
     """clean text to ensure json compatibility"""
 
@@ -19,51 +32,175 @@ def string_clean(sequence):
 
     return sequence
 
-def js_parser():
-    """retrieve all info necessary for squardle"""
-    #use link to get text
-    url = "https://squaredle.app/api/today-puzzle-config.js"
-    try:
-        data = requests.get(url, timeout=30).text
-    except:
-        logger.critical("Request Get URL unsuccessful.",exc_info=True)
-        return 0
-    
-    
-    #data format
-    data = str(data).split(";")
-    data = string_clean(data)
-    data_dict = dict()
+def js_string(value:str):
+    """Value of a javascript string literal: quotes removed and escapes (\\/, \\', \\n, \\uXXXX, ...) decoded"""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'`":
+        value = value[1:-1]
+    def unescape(match):
+        code = match.group(1)
+        if len(code) > 1:
+            return chr(int(code[1:], 16))
+        return ESCAPES.get(code, code)
+    return JS_ESCAPE.sub(unescape, value)
 
-    #create dictionary of the constant values generated by javascript
-    for const in data:
-        constant = const.split("=")
+def parse_date(text:str):
+    """datetime.date of a date of the config (see DATE_FORMATS), None if not recognised"""
+    for pattern in DATE_FORMATS:
         try:
-            key = constant[0].split(" ")[1]
-            value = "".join(constant[1:])
-            data_dict[key] = value.strip()
-        except:
-            pass
+            return datetime.strptime(text, pattern).date()
+        except ValueError:
+            continue
+    return None
+
+def parse_config(text:str):
+    """Parse the javascript of the puzzle config in a single pass.
+    Every top level 'var/let/const NAME = VALUE;' (or 'NAME = VALUE,' chained to it) gives a constant. Semicolons and commas inside strings and brackets don't end a value.
+    Puzzles and yesterday's words are decoded from json, dates are decoded as javascript strings (see js_string), any other value is kept as text.
+
+    Args:
+        text (str): javascript of today-puzzle-config.js
+
+    Returns:
+        dict: constant name: value
+    """
+    data_dict = dict()
+    match = DECLARATION.search(text)
+    while match:
+        depth = 0
+        end = len(text)
+        following = None
+        #jump through strings and brackets up to the semicolon (or comma of a new declaration) closing the value
+        for token in TOKEN.finditer(text, match.end()):
+            char = token.group()
+            if char in "([{":
+                depth += 1
+            elif char in ")]}":
+                depth -= 1
+            elif depth <= 0 and char == ";":
+                end = token.start()
+                break
+            elif depth <= 0 and char == ",":
+                following = CONTINUATION.match(text, token.end())
+                if following:
+                    end = token.start()
+                    break
+        data_dict[match.group(1)] = text[match.end():end].strip()
+        match = following or DECLARATION.search(text, end+1)
     message = "Dictionary has {0} constants: {1}.".format(len(data_dict)," ".join(list(data_dict.keys())))
     logger.info(message)
-    
-    #retrieve json file of previous day solutions
+
     data_dict[PREVIOUS_DAY_WORDS] = json.loads(data_dict[PREVIOUS_DAY_WORDS])
+    data_dict[PUZZLE] = json.loads(data_dict[PUZZLE])
+    for name in (TODAY, YESTERDAY):
+        data_dict[name] = js_string(data_dict[name])
+    return data_dict
+
+def date_key(date:str):
+    """Name of a date of the config (as gTodayDateStr) safe for file names and ordered in time: ISO format if recognised (see parse_date), else without slashes"""
+    parsed = parse_date(date)
+    if parsed is not None:
+        return parsed.isoformat()
+    return re.sub(r"[^\w.-]", "-", date)
+
+def _cache_file(name:str):
+    return CONFIG_PATH.joinpath(name)
 
-    #clean data of todays puzzle to transform in json file
+def load_config(date:str):
+    """Parsed puzzle config archived for date (as gTodayDateStr), None if not archived. Allows offline replay of past boards."""
     try:
-        data_dict[PUZZLE] = json.loads(data_dict[PUZZLE])
+        with open(_cache_file("{0}.json".format(date_key(date))), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def cached_dates():
+    """Dates of the archived puzzle configs (as gTodayDateStr), oldest first."""
+    dates = []
+    for path in sorted(CONFIG_PATH.glob("*.json")):
+        if path.name == META:
+            continue
+        try:
+            with open(path, "r") as f:
+                dates.append(json.load(f)[TODAY])
+        except:
+            message = "Archived config {0} unreadable".format(path.name)
+            logger.warning(message)
+    return dates
+
+def _store_config(text:str, data_dict:dict, headers):
+    """Archive raw and parsed config under its date (see date_key) and remember the validators of the response."""
+    CONFIG_PATH.mkdir(parents=True, exist_ok=True)
+    date = data_dict[TODAY]
+    with open(_cache_file("{0}.js".format(date_key(date))), "w") as f:
+        f.write(text)
+    with open(_cache_file("{0}.json".format(date_key(date))), "w") as f:
+        json.dump(data_dict, f)
+    meta = {"date": date, "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+    with open(_cache_file(META), "w") as f:
+        json.dump(meta, f)
+
+def js_parser(offline = False):
+    """retrieve all info necessary for squardle
+    The config is archived on disk by its date. The request is conditional (ETag/If-Modified-Since) on the last config archived,
+    so an unchanged config is read from disk. If the network is not available or the answer is an error (after the retries, see api_client),
+    the last archived config is used, only if it's the config of today.
+
+    Args:
+        offline (bool, optional): don't make any request, use the last archived config. Defaults to False.
+    """
+    try:
+        with open(_cache_file(META), "r") as f:
+            meta = json.load(f)
+    except:
+        meta = dict()
+    cached = load_config(meta["date"]) if meta.get("date") else None
+
+    if offline:
+        if cached is None:
+            logger.critical("No archived puzzle config for offline use.")
+            return 0
+        return cached
+
+    #use link to get text
+    headers = dict()
+    if cached is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        response = AC.client().get(AC.CONFIG_PATH, headers=headers)
+        if response.status_code != 304:
+            response.raise_for_status()
+    except:
+        if cached is not None and parse_date(cached[TODAY]) == date.today():
+            message = "Request Get URL unsuccessful. Using archived config of {0}".format(meta["date"])
+            logger.error(message, exc_info=True)
+            return cached
+        if cached is not None:
+            message = "Request Get URL unsuccessful. The archived config of {0} is not today's".format(meta["date"])
+            logger.critical(message,exc_info=True)
+            return 0
+        logger.critical("Request Get URL unsuccessful.",exc_info=True)
+        return 0
+    if response.status_code == 304:
+        message = "Puzzle config not modified. Using archived config of {0}".format(meta["date"])
+        logger.info(message)
+        return cached
+
+    try:
+        data_dict = parse_config(response.text)
     except:
         message = "App was not able to upload json with puzzle's info."
         logger.critical(message,exc_info=True)
         return 0
-
-
-    #clean dates
-    data_dict[TODAY] = "".join([l for l in data_dict[TODAY] if l != "\\" and l != "\'"])
-    data_dict[YESTERDAY] = "".join([l for l in data_dict[YESTERDAY] if l != "\\" and l != "\'"])
     message = "Cleaned the date constants. Current day is: {0}. Yesteday's date: {1}".format(data_dict[TODAY],data_dict[YESTERDAY])
     logger.info(message)
+    try:
+        _store_config(response.text, data_dict, response.headers)
+    except:
+        logger.warning("Unable to archive puzzle config", exc_info=True)
 
     logger.info("Successfully obtained Puzzle's Info")
 
@@ -9,6 +9,7 @@ CREDENTIAL_PATH = PATH.joinpath("assets").joinpath("credentials")
 
 #file names of credentials storage
 FILES = {"SQUAREDLE": "squaredle.credentials.json", "TELEGRAM": "telegram.credentials.json"}
+ACCOUNTS_FILES = {"SQUAREDLE": "squaredle.accounts.json"}      #list of the credentials of every account, kept apart so getcredentials always returns one account
 logger.debug("Available Services: {0}".format("".join(list(FILES.keys()))))
 
 #services
@@ -125,10 +126,38 @@ def getcredentials(service:str):
     if _correctinput(service):
         with open(_correctpath(service),"r") as f:
             try:
-                return json.load(f)
+                credentials = json.load(f)
             except:
                 logger.error("Credentials not available", exc_info=True)
                 return 0
+        if isinstance(credentials, list):
+            message = "Credentials file of {0} holds a list of accounts, the first is used. Move the list to {1}".format(service, ACCOUNTS_FILES.get(service.upper()))
+            logger.warning(message)
+            return credentials[0] if credentials else 0
+        return credentials
     else:
         #raise Error
         return 0
+
+#retrieve every account of a service
+def getaccounts(service:str = "SQUAREDLE"):
+    """Get the credentials of every account of a service, listed in its accounts file (see ACCOUNTS_FILES).
+    Without an accounts file the single account of the credentials file is returned.
+
+    Args:
+        service (str, optional): Possible values:   SQUAREDLE
+                                 Defaults to SQUAREDLE.
+
+    Returns:
+        list: credentials of each account
+    """
+    try:
+        with open(CREDENTIAL_PATH.joinpath(ACCOUNTS_FILES[service.upper()]),"r") as f:
+            accounts = json.load(f)
+        return accounts if isinstance(accounts, list) else [accounts]
+    except (KeyError, FileNotFoundError):
+        pass
+    except:
+        logger.error("Accounts file unreadable, using the single account", exc_info=True)
+    credentials = getcredentials(service)
+    return [credentials] if credentials else []
@@ -0,0 +1,203 @@
+""" Module runs the bot as a long-running daemon, instead of once a day from cron.
+The compiled dictionaries (used by the passes solved in the daemon process) and a signed in WebDriver are kept warm between runs,
+and a run starts as soon as a new gTodayDateStr is published. The long solve process is spawned, not forked, since the daemon runs threads.
+The WebDriver is health checked every HEALTH_INTERVAL and recycled if it doesn't answer within HEALTH_TIMEOUT.
+
+A local control socket (SOCKET_PATH) accepts one command per connection and answers with a JSON line:
+    status:     state of the daemon, date and stage times of the last run
+    run:        run now, even if the board of the day was already played
+    recycle:    restart the WebDriver
+    stop:       stop the daemon
+    """
+import json
+import pathlib
+import socket
+import socketserver
+import threading
+from time import time
+import Squardle.src.squardle_bot as SB
+import Squardle.src.squardle_solver as SS
+import Squardle.src.board_parser as BP
+import Squardle.src.credential_handler as CH
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+PATH = pathlib.Path(__file__).parent.parent.absolute()
+CACHE_PATH = PATH.joinpath("assets").joinpath("cache")
+SOCKET_PATH = CACHE_PATH.joinpath("daemon.sock")
+STATUS_PATH = CACHE_PATH.joinpath("daemon.json")       #date of the last run, so a restart doesn't play the same board again
+
+POLL = 300              #seconds between checks of the puzzle config
+HEALTH_INTERVAL = 60    #seconds between health checks of the WebDriver
+HEALTH_TIMEOUT = 30     #seconds the WebDriver has to answer a health check
+COMMANDS = ("status", "run", "recycle", "stop")
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except:
+        logger.warning("WebDriver not closed", exc_info=True)
+
+class Daemon:
+    """Warm bot that plays every new board.
+
+    Args:
+        run (callable): plays the board of the day on the given signed in driver with the given dictionaries and returns the wall time of its stages,
+            as main.bot(driver=driver, word_lists=word_lists, start_method="spawn")
+    """
+
+    def __init__(self, run):
+        self.run = run
+        self.credentials = CH.getcredentials("SQUAREDLE")
+        self.driver = None
+        self.dictionaries = None
+        self.wake = threading.Event()
+        self.requests = set()
+        self.stopping = threading.Event()
+        self.status = {"state": "starting", "started": time(), "last_date": None, "last_run": None, "last_stages": None, "last_error": None, "recycled": 0}
+        try:
+            with open(STATUS_PATH, "r") as f:
+                self.status["last_date"] = json.load(f).get("last_date")
+        except:
+            pass
+
+    def warm(self):
+        """Open the compiled dictionaries of both passes and start a signed in WebDriver"""
+        self.dictionaries = (SS.dictionary_maker(mill_list=False), SS.dictionary_maker(list1=False, json_l=False, mill_list=True))
+        self.check(force=True)
+
+    def recycle(self):
+        """Start a new signed in WebDriver. The old one is quit in the background, in case it's wedged."""
+        old, self.driver = self.driver, None
+        if old is not None:
+            threading.Thread(target=_quit, args=(old,), daemon=True).start()
+            self.status["recycled"] += 1
+        self.driver = SB.setup(_headless = True)
+        SB.cookies(self.driver)
+        SB.signin(self.driver, self.credentials)
+        logger.info("WebDriver ready")
+
+    def check(self, force = False):
+        """Health check of the WebDriver, recycled if it fails or doesn't answer within HEALTH_TIMEOUT.
+
+        Args:
+            force (bool, optional): recycle without checking. Defaults to False.
+
+        Returns:
+            bool: the WebDriver was healthy
+        """
+        answer = []
+        if self.driver is not None and not force:
+            probe = threading.Thread(target=lambda: answer.append(SB.healthy(self.driver, self.credentials)), daemon=True)
+            probe.start()
+            probe.join(HEALTH_TIMEOUT)
+        if answer and answer[0]:
+            return True
+        if not force:
+            logger.warning("WebDriver unhealthy. Recycling")
+        try:
+            self.recycle()
+        except:
+            logger.error("WebDriver not recycled", exc_info=True)
+        return False
+
+    def today(self):
+        """Date of the puzzle published now, None if not available"""
+        setup = BP.js_parser()
+        return setup.get(BP.TODAY) if isinstance(setup, dict) else None
+
+    def play(self, date):
+        """Run the bot on the warm driver and record the run"""
+        self.status["state"] = "running"
+        start = time()
+        try:
+            self.check()
+            self.status["last_stages"] = self.run(driver=self.driver, word_lists=self.dictionaries, start_method="spawn")
+            self.status["last_date"] = date
+            self.status["last_error"] = None
+            STATUS_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(STATUS_PATH, "w") as f:
+                json.dump({"last_date": date}, f)
+        except Exception as e:
+            logger.error("Run failed", exc_info=True)
+            self.status["last_error"] = repr(e)
+            self.check()
+        self.status["last_run"] = start
+        self.status["state"] = "idle"
+
+    def request(self, command:str):
+        """Handle a command of the control socket"""
+        if command == "status":
+            return dict(self.status, now=time())
+        if command not in COMMANDS:
+            return {"error": "unknown command {0}, expected one of {1}".format(command, ", ".join(COMMANDS))}
+        self.requests.add(command)
+        if command == "stop":
+            self.stopping.set()
+        self.wake.set()
+        return {"ok": command}
+
+    def loop(self):
+        """Poll the puzzle config every POLL and play every new date. Health check the driver every HEALTH_INTERVAL."""
+        last_poll = last_health = 0
+        while not self.stopping.is_set():
+            self.wake.clear()
+            self.status["state"] = "idle"
+            pending, self.requests = self.requests, set()
+            if "recycle" in pending or time()-last_health >= HEALTH_INTERVAL:
+                self.check(force="recycle" in pending)
+                last_health = time()
+            date = None
+            if "run" in pending or time()-last_poll >= POLL:
+                last_poll = time()
+                date = self.today()
+            if date is not None and ("run" in pending or date != self.status["last_date"]):
+                message = "Playing board of {0}".format(date)
+                logger.info(message)
+                self.play(date)
+                last_health = time()
+            self.wake.wait(min(POLL, HEALTH_INTERVAL))
+
+    def serve(self):
+        """Warm up, open the control socket and loop until stopped"""
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                command = self.rfile.readline().decode().strip()
+                self.wfile.write((json.dumps(daemon.request(command))+"\n").encode())
+
+        SOCKET_PATH.parent.mkdir(parents=True, exist_ok=True)
+        SOCKET_PATH.unlink(missing_ok=True)
+        server = socketserver.ThreadingUnixStreamServer(str(SOCKET_PATH), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        message = "Control socket listening on {0}".format(SOCKET_PATH)
+        logger.info(message)
+        try:
+            self.warm()
+            self.loop()
+        finally:
+            server.shutdown()
+            server.server_close()
+            SOCKET_PATH.unlink(missing_ok=True)
+            if self.driver is not None:
+                _quit(self.driver)
+            logger.info("Daemon stopped")
+
+def control(command:str, timeout:float = 10):
+    """Send a command to a running daemon.
+
+    Returns:
+        dict: answer of the daemon
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(SOCKET_PATH))
+        client.sendall((command+"\n").encode())
+        return json.loads(client.makefile().readline())
+
+if __name__ == "__main__":
+    import sys
+    logger.new_stream()
+    print(json.dumps(control(sys.argv[1] if len(sys.argv) > 1 else "status"), indent=4))
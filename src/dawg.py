@@ -0,0 +1,224 @@
+""" Module builds a compact dictionary for low-memory hosts: a minimal acyclic automaton (DAWG) of the word list.
+Prefixes and suffixes are shared, and the automaton is stored in flat buffers instead of one python object per word.
+
+Layout of the file (little endian):
+    header:     MAGIC, version, number of nodes (N), number of edges (E)
+    first:      N+1 unsigned int, first edge of each node
+    final:      N bytes, 1 if the node closes a word
+    targets:    E unsigned int, node reached by each edge
+    labels:     E bytes, letter of each edge. Edges of a node are sorted by letter.
+Node 0 is the root.
+    """
+import mmap
+import pathlib
+import struct
+import sys
+from array import array
+from tqdm import tqdm
+import Squardle.src.word_store as WS
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+MAGIC = b"SQDA"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+END = "$"           #same terminal key of the trie in squardle_solver
+
+class _BuildNode:
+    """Mutable node used only while building the automaton."""
+    __slots__ = ("edges", "final", "id")
+
+    def __init__(self):
+        self.edges = {}
+        self.final = False
+        self.id = -1
+
+    def key(self):
+        return (self.final, tuple((letter, child.id) for letter, child in sorted(self.edges.items())))
+
+def _build(words):
+    """Incremental construction of the minimal automaton from sorted words (Daciuk et al.).
+
+    Returns:
+        _BuildNode: root of the automaton
+    """
+    root = _BuildNode()
+    register = {}
+    unchecked = []      #(parent, letter, child) of the path of the previous word not yet minimised
+    previous = ""
+
+    def minimise(down_to):
+        while len(unchecked) > down_to:
+            parent, letter, child = unchecked.pop()
+            key = child.key()
+            if key in register:
+                parent.edges[letter] = register[key]
+            else:
+                child.id = len(register)+1
+                register[key] = child
+
+    for word in tqdm(words):
+        if word <= previous:
+            if word == previous:
+                continue
+            raise ValueError("Words must be sorted to build the automaton")
+        common = 0
+        for a,b in zip(word, previous):
+            if a != b:
+                break
+            common += 1
+        minimise(common)
+        node = unchecked[-1][2] if unchecked else root
+        for letter in word[common:]:
+            child = _BuildNode()
+            node.edges[letter] = child
+            unchecked.append((node, letter, child))
+            node = child
+        node.final = True
+        previous = word
+    minimise(0)
+    return root
+
+def _flatten(root:_BuildNode):
+    """Number the nodes breadth first from the root and pack them in flat buffers."""
+    index = {id(root): 0}
+    order = [root]
+    first = array("I", [0])
+    final = bytearray()
+    targets = array("I")
+    labels = bytearray()
+    for node in order:
+        final.append(node.final)
+        for letter, child in sorted(node.edges.items()):
+            if id(child) not in index:
+                index[id(child)] = len(order)
+                order.append(child)
+            targets.append(index[id(child)])
+            labels.append(ord(letter))
+        first.append(len(targets))
+    return first, final, targets, labels
+
+def write_dawg(path, words):
+    """Build the automaton of sorted words and write it to path."""
+    first, final, targets, labels = _flatten(_build(words))
+    path = pathlib.Path(path)
+    temp = path.with_suffix(".tmp")
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(final), len(labels)))
+        f.write(first.tobytes())
+        f.write(final)
+        f.write(targets.tobytes())
+        f.write(labels)
+    temp.replace(path)
+    message = "Automaton of {0} nodes and {1} edges written in {2}".format(len(final), len(labels), path.name)
+    logger.info(message)
+
+class Dawg:
+    """Memory mapped automaton. Supports prefix walking and membership tests."""
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, nodes, edges = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("Not a compiled automaton: {0}".format(self.path))
+        self.nodes = nodes
+        self.edges = edges
+        start = HEADER.size
+        view = memoryview(self._map)
+        self._first = view[start:start+4*(nodes+1)].cast("I")
+        start += 4*(nodes+1)
+        self._final = view[start:start+nodes]
+        start += nodes
+        self._targets = view[start:start+4*edges].cast("I")
+        self._labels = start+4*edges        #offset of the labels in the map
+
+    def child(self, node:int, letter:str):
+        """Node reached from node through letter. -1 if there's none."""
+        edge = self._map.find(letter.encode(), self._labels+self._first[node], self._labels+self._first[node+1])
+        if edge < 0:
+            return -1
+        return self._targets[edge-self._labels]
+
+    def is_final(self, node:int):
+        return self._final[node] == 1
+
+    def walk(self, prefix:str, node:int = 0):
+        """Node reached by prefix. -1 if no word starts with prefix."""
+        for letter in prefix:
+            node = self.child(node, letter)
+            if node < 0:
+                return -1
+        return node
+
+    def __contains__(self, word):
+        node = self.walk(word)
+        return node >= 0 and self.is_final(node)
+
+    def __iter__(self):
+        stack = [(0, "")]
+        while stack:
+            node, word = stack.pop()
+            if self.is_final(node):
+                yield word
+            for edge in range(self._first[node+1]-1, self._first[node]-1, -1):
+                stack.append((self._targets[edge], word+chr(self._map[self._labels+edge])))
+
+    def root(self):
+        return DawgNode(self, 0)
+
+    def nbytes(self):
+        return len(self._map)
+
+    def __repr__(self):
+        return "Dawg({0}, {1} nodes, {2} edges)".format(self.path.name, self.nodes, self.edges)
+
+class DawgNode:
+    """View of a node of the automaton with the same lookups of a trie node (see squardle_solver.make_trie)."""
+    __slots__ = ("dawg", "node")
+
+    def __init__(self, dawg:Dawg, node:int):
+        self.dawg = dawg
+        self.node = node
+
+    def get(self, letter, default=None):
+        node = self.dawg.child(self.node, letter)
+        return default if node < 0 else DawgNode(self.dawg, node)
+
+    def __contains__(self, key):
+        if key == END:
+            return self.dawg.is_final(self.node)
+        return self.dawg.child(self.node, key) >= 0
+
+    def __getitem__(self, letter):
+        node = self.get(letter)
+        if node is None:
+            raise KeyError(letter)
+        return node
+
+def load_dawg(list1 = True, json_l = True, mill_list = True):
+    """Open the automaton of the selected lists, building it from the compiled artifact if missing or out of date.
+
+    Returns:
+        Dawg: memory mapped automaton
+    """
+    words = WS.load_dictionary(list1=list1, json_l=json_l, mill_list=mill_list)
+    path = words.path.with_suffix(".dawg")
+    if not path.exists():
+        logger.info("Automaton missing or out of date. Rebuilding")
+        write_dawg(path, words)
+    return Dawg(path)
+
+def memory_comparison(words, dawg:Dawg):
+    """Compare the memory of the words as a python list of strings against the automaton buffers.
+
+    Returns:
+        tuple: bytes of the list representation, bytes of the automaton
+    """
+    list_bytes = sys.getsizeof(words) + sum(sys.getsizeof(w) for w in words)
+    dawg_bytes = dawg.nbytes()
+    message = "Word list: {0:.1f} MB as python list, {1:.1f} MB as automaton".format(list_bytes/2**20, dawg_bytes/2**20)
+    logger.info(message)
+    return list_bytes, dawg_bytes
@@ -0,0 +1,82 @@
+""" Module compiles the words Squaredle does not accept in a single exclusion index: proper nouns, banned guesses and inappropriate words.
+The index is a sorted word artifact (see word_store) keyed by a content hash of its sources, so it's rebuilt when one of them changes.
+The proper nouns can be refreshed from a local copy of https://squaredle.app/api/static/names-short.csv
+    """
+import csv
+import hashlib
+import pathlib
+import Squardle.src.word_store as WS
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+PATH = pathlib.Path(__file__).parent.parent.absolute()
+ASSETS_PATH = PATH.joinpath("assets")
+SOURCES = [ASSETS_PATH.joinpath("proper_noun.txt"), ASSETS_PATH.joinpath("banned_words.txt")]    #gBannedGuesses and gInappropriateWords
+
+def _read(path):
+    with open(path, "r") as f:
+        return [line.strip().lower() for line in f if line.strip()]
+
+def source_hash(extra = ()):
+    """Content hash of the source lists and of the extra words"""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in SOURCES:
+        try:
+            digest.update(path.read_bytes())
+        except FileNotFoundError:
+            digest.update(b"missing")
+    for w in sorted(extra):
+        digest.update(w.encode()+b"\n")
+    return digest.hexdigest()
+
+def load_exclusions(extra = ()):
+    """Open the exclusion index of the source lists and of the extra words, compiling it first if missing or out of date.
+    Several processes may compile it at once (see word_store.compile_dictionary): other stale indexes are removed, an index already written by another process is kept.
+
+    Returns:
+        word_store.MappedWords: sorted excluded words, supports 'in'
+    """
+    path = WS.COMPILED_PATH.joinpath("exclusions-{0}.bin".format(source_hash(extra)))
+    if not path.exists():
+        words = set(extra)
+        for source in SOURCES:
+            try:
+                words.update(_read(source))
+            except:
+                message = "{0} not available".format(source.name)
+                logger.error(message)
+        for stale in WS.COMPILED_PATH.glob("exclusions-*"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        if path.exists():
+            message = "Exclusion index {0} already compiled by another process".format(path.name)
+            logger.info(message)
+        else:
+            WS.write_artifact(path, sorted(w for w in words if w.isascii()))
+            message = "Compiled exclusion index of {0} words".format(len(words))
+            logger.info(message)
+    return WS.MappedWords(path)
+
+def refresh_proper_nouns(csv_path):
+    """Replace the proper nouns list with the names of a local copy of names-short.csv (first column of each row).
+
+    Returns:
+        int: number of proper nouns
+    """
+    with open(csv_path, "r", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            header = csv.Sniffer().has_header(sample)
+        except csv.Error:
+            header = False
+        rows = csv.reader(f)
+        if header:
+            next(rows)
+        names = {row[0].strip().lower() for row in rows if row and row[0].strip()}
+    names = sorted(n for n in names if n.isalpha())
+    with open(SOURCES[0], "w") as f:
+        f.write("\n".join(names)+"\n")
+    message = "Proper nouns refreshed: {0} names".format(len(names))
+    logger.info(message)
+    return len(names)
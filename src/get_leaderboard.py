@@ -1,22 +1,173 @@
-import requests
-# import json
+""" Module fetches the leaderboards of the puzzles and keeps them in a local SQLite store (STORE_PATH).
+Leaderboards are paged with lastScore, the score of the last entry of the previous page. Several puzzles and favourite lists are paged concurrently (see refresh).
+A refresh is incremental: the leaderboard of the puzzle of the day is fetched from the top until a page brings nothing new,
+past puzzles resume from the last page stored and are not fetched again once complete: paged to an empty page, or to a page that doesn't move the cursor.
+Our rank over time (see rank_history) is a local query.
+    """
+import asyncio
+import json
+import pathlib
+import sqlite3
+from time import time
+import Squardle.src.api_client as AC
+import Squardle.src.board_parser as BP
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
 
-URL = "https://squaredle.app/api/index.php"
-KEYS = ["op","args"]
 OP = "getLeaderboardScores"
 ARGS = ["puzzleID","showDebug","favorites","isBetaPuzzle","lastScore","getCompletedPercentiles","uuid","game"]
 
+PATH = pathlib.Path(__file__).parent.parent.absolute()
+STORE_PATH = PATH.joinpath("assets").joinpath("cache").joinpath("leaderboard.sqlite3")
+MAX_PAGES = 100                                     #pages of a leaderboard fetched by one refresh
+USER_KEYS = ("uuid","userId","user","username","name")     #first key of an entry identifying the player
+SCORE_KEY = "score"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (puzzle TEXT, favorites INTEGER, user TEXT, score REAL, entry TEXT, fetched REAL, PRIMARY KEY (puzzle, favorites, user));
+CREATE INDEX IF NOT EXISTS scores_user ON scores (user, puzzle);
+CREATE TABLE IF NOT EXISTS cursors (puzzle TEXT, favorites INTEGER, last_score REAL, complete INTEGER, updated REAL, PRIMARY KEY (puzzle, favorites));
+"""
+
 def get_leaderboard(**kwargs):
     """Return JSON response from the api.
     Give following paramenters: ["puzzleID","showDebug","favorites","isBetaPuzzle","lastScore","getCompletedPercentiles","uuid","game"]
     """
     args = {k:kwargs[k] for k in ARGS if k in kwargs}
     if all(k in kwargs for k in ARGS):
-        dict_data = {KEYS[1]:OP,KEYS[2]:args}
-        response = requests.post(URL, json=dict_data,timeout=100)
+        return AC.client().api(OP, args)
     else:
         raise ReferenceError
-    if response.ok:
-        return response.json()
-    response.raise_for_status()
-    
+
+async def get_leaderboard_async(**kwargs):
+    """get_leaderboard, awaitable (see api_client.run)"""
+    args = {k:kwargs[k] for k in ARGS if k in kwargs}
+    if all(k in kwargs for k in ARGS):
+        return await AC.client().api_async(OP, args)
+    else:
+        raise ReferenceError
+
+def entries(response):
+    """Score entries of a leaderboard answer: the first list of objects with a score found in it"""
+    if isinstance(response, list):
+        if response and all(isinstance(e, dict) and SCORE_KEY in e for e in response):
+            return response
+        items = response
+    elif isinstance(response, dict):
+        items = response.values()
+    else:
+        return []
+    for item in items:
+        found = entries(item)
+        if found:
+            return found
+    return []
+
+def player(entry:dict):
+    """Identifier of the player of an entry"""
+    for key in USER_KEYS:
+        if entry.get(key) is not None:
+            return str(entry[key])
+    return json.dumps(entry, sort_keys=True)
+
+def open_store(path = STORE_PATH):
+    """Connection to the leaderboard store, created if missing"""
+    pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+    store = sqlite3.connect(path)
+    store.executescript(SCHEMA)
+    return store
+
+def _store_page(store, puzzle:str, favorites:bool, page:list):
+    """Upsert a page of entries. Returns the number of entries new or changed"""
+    now = time()
+    changed = 0
+    for entry in page:
+        user, score, data = player(entry), entry[SCORE_KEY], json.dumps(entry, sort_keys=True)
+        row = store.execute("SELECT entry FROM scores WHERE puzzle=? AND favorites=? AND user=?", (puzzle, int(favorites), user)).fetchone()
+        if row is None or row[0] != data:
+            changed += 1
+            store.execute("INSERT OR REPLACE INTO scores VALUES (?,?,?,?,?,?)", (puzzle, int(favorites), user, score, data, now))
+    return changed
+
+async def _page_leaderboard(store, puzzle:str, favorites:bool, uuid:str, final:bool, full:bool):
+    """Fetch the pages of a leaderboard from the stored cursor. Returns the number of entries new or changed"""
+    cursor = store.execute("SELECT last_score, complete FROM cursors WHERE puzzle=? AND favorites=?", (puzzle, int(favorites))).fetchone()
+    if cursor is not None and cursor[1] and not full:
+        return 0
+    last_score = cursor[0] if cursor is not None and final and not full else None
+    changed = 0
+    complete = False
+    for _ in range(MAX_PAGES):
+        response = await get_leaderboard_async(puzzleID=puzzle, showDebug=False, favorites=favorites, isBetaPuzzle=False,
+                                               lastScore=last_score, getCompletedPercentiles=False, uuid=uuid, game="squaredle")
+        page = entries(response)
+        if not page:
+            complete = final
+            break
+        new = _store_page(store, puzzle, favorites, page)
+        changed += new
+        #a page ending on the cursor score can't be paged past with lastScore: the end, or a tie longer than a page
+        repeated = page[-1][SCORE_KEY] == last_score or not new
+        if repeated and final:
+            if new:
+                message = "Leaderboard {0}: entries tied at score {1} beyond one page can't be paged, marked complete".format(puzzle, last_score)
+                logger.warning(message)
+            complete = True
+            break
+        if repeated:
+            break
+        last_score = page[-1][SCORE_KEY]
+    store.execute("INSERT OR REPLACE INTO cursors VALUES (?,?,?,?,?)", (puzzle, int(favorites), last_score, int(complete), time()))
+    store.commit()
+    message = "Leaderboard {0}{1}: {2} entries new or changed".format(puzzle, " (favorites)" if favorites else "", changed)
+    logger.info(message)
+    return changed
+
+def _past(puzzle:str, today:str):
+    """True if the puzzle is older than today, comparing the parsed dates (see board_parser.parse_date). Every puzzle is past without today, none if a date isn't recognised."""
+    if today is None:
+        return True
+    puzzle, today = BP.parse_date(puzzle), BP.parse_date(today)
+    return puzzle is not None and today is not None and puzzle < today
+
+def refresh(puzzles, uuid:str, favorites = (False, True), today:str = None, full:bool = False, store = None):
+    """Fetch the new entries of the leaderboards of puzzles, all concurrently.
+
+    Args:
+        puzzles (iterable): puzzle ids, as gTodayDateStr
+        uuid (str): uuid of the account
+        favorites (iterable, optional): leaderboards of each puzzle: everyone (False) and favorites (True). Defaults to both.
+        today (str, optional): puzzle still being played, whose leaderboard is never complete. Older puzzles, compared as dates, are complete once paged to the end. Defaults to None.
+        full (bool, optional): fetch everything again from the first page. Defaults to False.
+        store (optional): connection to the store (see open_store). Defaults to STORE_PATH.
+
+    Returns:
+        dict: (puzzle, favorites): number of entries new or changed, or the exception if the fetch failed
+    """
+    if store is None:
+        store = open_store()
+    targets = [(p, f) for p in puzzles for f in favorites]
+    async def fetch_all():
+        return await asyncio.gather(*[_page_leaderboard(store, p, f, uuid, _past(p, today), full) for p, f in targets], return_exceptions=True)
+    results = dict(zip(targets, asyncio.run(fetch_all())))
+    for target, result in results.items():
+        if isinstance(result, Exception):
+            message = "Leaderboard {0} not fetched: {1!r}".format(target, result)
+            logger.error(message)
+    return results
+
+def rank_history(user:str, favorites:bool = False, store = None):
+    """Rank of a player in every stored puzzle, from the local store. Higher scores rank first.
+
+    Args:
+        user (str): player identifier (see player)
+        favorites (bool, optional): rank among favorites. Defaults to False.
+        store (optional): connection to the store (see open_store). Defaults to STORE_PATH.
+
+    Returns:
+        list: (puzzle, rank, score, players) by puzzle
+    """
+    if store is None:
+        store = open_store()
+    return store.execute("""SELECT s.puzzle, 1+(SELECT COUNT(*) FROM scores o WHERE o.puzzle=s.puzzle AND o.favorites=s.favorites AND o.score>s.score),
+                                   s.score, (SELECT COUNT(*) FROM scores o WHERE o.puzzle=s.puzzle AND o.favorites=s.favorites)
+                            FROM scores s WHERE s.user=? AND s.favorites=? ORDER BY s.puzzle""", (user, int(favorites))).fetchall()
@@ -0,0 +1,194 @@
+""" Module keeps a persistent store of the words Squaredle rejects, so they are not submitted again.
+The store is a sorted word artifact (see word_store) opened memory mapped, membership tests are binary searches.
+It's populated comparing the words submitted on a day against the words the game accepted (sync data) and the official list of the day (gYesterdayWords).
+A word missing from those lists may also have been dropped by the page or be a bonus word the lists don't show, so a single day is no proof:
+the days each word was not accepted are kept in a ledger (LEDGER_PATH) and a word enters the store only once not accepted on MIN_DAYS different days.
+A word accepted on any day leaves the ledger, days older than MAX_AGE are forgotten (see expire) and the ledger can be inspected and corrected (see review and forgive).
+    """
+import json
+import pathlib
+from datetime import date as Date
+import Squardle.src.word_store as WS
+import Squardle.src.board_parser as BP
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+PATH = pathlib.Path(__file__).parent.parent.absolute()
+CACHE_PATH = PATH.joinpath("assets").joinpath("cache")
+REJECTED_PATH = CACHE_PATH.joinpath("rejected.bin")
+SUBMITTED_PATH = CACHE_PATH.joinpath("submitted")
+LEDGER_PATH = CACHE_PATH.joinpath("rejections.json")     #word: days it was submitted and not accepted
+MIN_DAYS = 2            #days a word must be not accepted on before it's stored as rejected
+MAX_AGE = 180           #days a rejection is remembered
+
+def load():
+    """Words known to be rejected (sorted, supports 'in'). Empty list if none recorded yet."""
+    try:
+        return WS.MappedWords(REJECTED_PATH)
+    except FileNotFoundError:
+        return []
+    except:
+        logger.error("Rejected words store unreadable", exc_info=True)
+        return []
+
+def _save(words):
+    WS.write_artifact(REJECTED_PATH, sorted(words))
+
+def _load_ledger():
+    try:
+        with open(LEDGER_PATH, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict()
+
+def _save_ledger(ledger:dict):
+    CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    temp = LEDGER_PATH.with_suffix(".tmp")
+    with open(temp, "w") as f:
+        json.dump(ledger, f, sort_keys=True)
+    temp.replace(LEDGER_PATH)
+
+def _rebuild(ledger:dict, min_days:int = MIN_DAYS):
+    """Save the words of the ledger not accepted on min_days days as the store. Returns the size of the store"""
+    old = set(load())
+    words = {w for w, days in ledger.items() if len(days) >= min_days}
+    if words != old:
+        _save(words)
+    message = "Rejected words store: {0} words ({1:+d}), {2} words not accepted on fewer than {3} days".format(len(words), len(words)-len(old), len(ledger)-len(words), min_days)
+    logger.info(message)
+    return len(words)
+
+def _age(day:str, today):
+    parsed = BP.parse_date(day)
+    return (today-parsed).days if parsed is not None else 0
+
+def update(date:str, rejected = (), accepted = ()):
+    """Record the words not accepted on date in the ledger, remove the accepted ones and rebuild the store.
+
+    Args:
+        date (str): day of the submissions, as gTodayDateStr
+        rejected (iterable, optional): words submitted on date and not accepted. Defaults to ().
+        accepted (iterable, optional): words accepted on any day. Defaults to ().
+
+    Returns:
+        int: size of the store
+    """
+    ledger = _load_ledger()
+    for w in rejected:
+        if w.isascii():
+            ledger[w] = sorted(set(ledger.get(w, [])).union([date]))
+    for w in accepted:
+        ledger.pop(w, None)
+    _save_ledger(ledger)
+    return _rebuild(ledger)
+
+def expire(max_age:int = MAX_AGE, today = None):
+    """Forget the days of the ledger older than max_age days, and the words left without days.
+
+    Args:
+        max_age (int, optional): days a rejection is remembered. Defaults to MAX_AGE.
+        today (datetime.date, optional): Defaults to today.
+
+    Returns:
+        int: size of the store
+    """
+    today = today or Date.today()
+    ledger = _load_ledger()
+    kept = dict()
+    for w, days in ledger.items():
+        days = [d for d in days if _age(d, today) <= max_age]
+        if days:
+            kept[w] = days
+    message = "Rejected words ledger: {0} words expired".format(len(ledger)-len(kept))
+    logger.info(message)
+    _save_ledger(kept)
+    return _rebuild(kept)
+
+def review(min_days:int = 1):
+    """Words of the ledger not accepted on min_days days or more, to check the store by hand.
+
+    Returns:
+        dict: word: days it was not accepted, most frequently rejected first
+    """
+    ledger = _load_ledger()
+    words = sorted((w for w, days in ledger.items() if len(days) >= min_days), key=lambda w: (-len(ledger[w]), w))
+    return {w: ledger[w] for w in words}
+
+def forgive(words):
+    """Remove words wrongly recorded as rejected from the ledger and the store.
+
+    Returns:
+        int: size of the store
+    """
+    ledger = _load_ledger()
+    for w in words:
+        ledger.pop(w, None)
+    _save_ledger(ledger)
+    return _rebuild(ledger)
+
+def filter_words(words, rejected = None):
+    """Generator of the words not known to be rejected"""
+    if rejected is None:
+        rejected = load()
+    for w in words:
+        if w not in rejected:
+            yield w
+
+def _day_file(date:str):
+    return SUBMITTED_PATH.joinpath("{0}.json".format(BP.date_key(date)))
+
+def _load_day(date:str):
+    try:
+        with open(_day_file(date), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"submitted": [], "accepted": []}
+
+def submitted_words(date:str):
+    """Words submitted on date (as gTodayDateStr), empty set if none recorded"""
+    return set(_load_day(date)["submitted"])
+
+def accepted_words(date:str):
+    """Words accepted on date (as gTodayDateStr) according to the sync data (see update_from_sync), empty set if none recorded"""
+    return set(_load_day(date)["accepted"])
+
+def record_submissions(date:str, words):
+    """Remember the words submitted on date (as gTodayDateStr)"""
+    SUBMITTED_PATH.mkdir(parents=True, exist_ok=True)
+    day = _load_day(date)
+    day["submitted"] = sorted(set(day["submitted"]).union(words))
+    with open(_day_file(date), "w") as f:
+        json.dump(day, f)
+
+def update_from_sync(date:str, todays_data:dict):
+    """Record the words accepted on date from the 'today' state of the sync data (see main.result),
+    and the words submitted that day that were not accepted in the ledger (see update).
+
+    Returns:
+        int: size of the store
+    """
+    day = _load_day(date)
+    accepted = set(todays_data.get("words", [])).union(todays_data.get("optionalWords", []))
+    day["accepted"] = sorted(accepted.union(day["accepted"]))
+    if day["submitted"]:
+        with open(_day_file(date), "w") as f:
+            json.dump(day, f)
+    return update(date, rejected=set(day["submitted"]).difference(day["accepted"]), accepted=accepted)
+
+def update_from_previous_day(setup:dict):
+    """Compare the words submitted yesterday against yesterday's official list (see board_parser.previous_day).
+    Official words are removed from the ledger; submitted words neither official nor accepted are recorded in it (see update).
+    Rejections older than MAX_AGE are forgotten (see expire).
+
+    Returns:
+        int: size of the store
+    """
+    board, bonus_word, words = BP.previous_day(setup)
+    if not words:
+        return len(load())
+    official = set(words)
+    official.add(bonus_word)
+    day = _load_day(setup[BP.YESTERDAY])
+    rejected = set(day["submitted"]).difference(official, day["accepted"])
+    update(setup[BP.YESTERDAY], rejected=rejected, accepted=official)
+    return expire()
@@ -0,0 +1,98 @@
+""" Module replays the solver on past puzzles, to choose the dictionary mix by its results instead of guessing.
+Every archived puzzle config (see board_parser.load_config) carries the board of the previous day and its official solutions (see board_parser.previous_day).
+For each dictionary of CONFIGURATIONS the board is solved and compared with the official list:
+    recall:     official words found / official words
+    precision:  official words found / words found. The other words found are the extra words that would have been submitted
+    accepted_per_sec:   official words found / seconds to solve and type all the words found (TYPING seconds each)
+    """
+from time import perf_counter
+import Squardle.src.squardle_solver as SS
+import Squardle.src.board_parser as BP
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+#arguments of dictionary_maker
+CONFIGURATIONS = {"list1": {"list1": True, "json_l": False, "mill_list": False},
+                  "json_l": {"list1": False, "json_l": True, "mill_list": False},
+                  "quick": {"list1": True, "json_l": True, "mill_list": False},
+                  "mill_list": {"list1": False, "json_l": False, "mill_list": True},
+                  "all": {"list1": True, "json_l": True, "mill_list": True}}
+TYPING = 0.02       #seconds to submit a word, as squardle_bot.PACING
+
+def past_puzzles(dates = None):
+    """Past boards with their official solutions, from the archived configs.
+
+    Args:
+        dates (iterable, optional): dates of the archived configs. Defaults to all (see board_parser.cached_dates).
+
+    Returns:
+        list: (date of the board, board, official words including the bonus word)
+    """
+    puzzles = []
+    for date in BP.cached_dates() if dates is None else dates:
+        setup = BP.load_config(date)
+        if not setup:
+            continue
+        board, bonus_word, words = BP.previous_day(setup)
+        if not words:
+            continue
+        puzzles.append((setup[BP.YESTERDAY], board, set(words).union([bonus_word])))
+    return puzzles
+
+def replay_board(board:list, official:set, dictionary, invalid = ()):
+    """Solve a past board and score the result against the official words.
+
+    Returns:
+        dict: found, official, hits, extra, recall, precision, solve_time, accepted_per_sec
+    """
+    start = perf_counter()
+    found = {w for w in SS.board_solver(board, dictionary) if w not in invalid}
+    solve_time = perf_counter()-start
+    hits = len(found & official)
+    return {"found": len(found), "official": len(official), "hits": hits, "extra": len(found)-hits,
+            "recall": hits/max(len(official), 1), "precision": hits/max(len(found), 1),
+            "solve_time": solve_time, "accepted_per_sec": hits/max(solve_time+len(found)*TYPING, 1e-9)}
+
+def replay(dates = None, configurations:dict = CONFIGURATIONS):
+    """Replay the solver with every dictionary configuration on the past puzzles.
+
+    Args:
+        dates (iterable, optional): dates of the archived configs. Defaults to all.
+        configurations (dict, optional): name: arguments of dictionary_maker. Defaults to CONFIGURATIONS.
+
+    Returns:
+        dict: name of the configuration: "boards": date: result (see replay_board), "summary": totals and means over the boards
+    """
+    puzzles = past_puzzles(dates)
+    message = "Replaying {0} past puzzles".format(len(puzzles))
+    logger.info(message)
+    invalid = SS.invalid_words()
+    report = dict()
+    for name, arguments in configurations.items():
+        dictionary = SS.dictionary_maker(**arguments)
+        if not len(dictionary):
+            message = "Dictionary {0} not available, skipped".format(name)
+            logger.warning(message)
+            continue
+        boards = {date: replay_board(board, official, dictionary, invalid) for date, board, official in puzzles}
+        summary = {key: sum(b[key] for b in boards.values()) for key in ("found", "official", "hits", "extra", "solve_time")}
+        summary["recall"] = summary["hits"]/max(summary["official"], 1)
+        summary["precision"] = summary["hits"]/max(summary["found"], 1)
+        summary["accepted_per_sec"] = summary["hits"]/max(summary["solve_time"]+summary["found"]*TYPING, 1e-9)
+        report[name] = {"boards": boards, "summary": summary}
+        message = "{0}: recall {recall:.1%} | precision {precision:.1%} | {extra} extra words | solve {solve_time:.2f}s | {accepted_per_sec:.1f} accepted/s".format(name, **summary)
+        logger.info(message)
+    return report
+
+def best_configuration(report:dict):
+    """Name of the configuration with the most accepted words per second, None if the report is empty"""
+    if not report:
+        return None
+    return max(report, key=lambda name: report[name]["summary"]["accepted_per_sec"])
+
+if __name__ == "__main__":
+    logger.new_stream()
+    logger.setLevel("INFO")
+    report = replay()
+    message = "Best dictionary mix: {0}".format(best_configuration(report))
+    logger.info(message)
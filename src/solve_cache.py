@@ -0,0 +1,96 @@
+""" Module keeps the solutions of the boards on disk, so that reruns on the same board (retries, debugging, crashes) are a single file read.
+A solution is keyed by the board rows, the fingerprint of the dictionary (see word_store.fingerprint), MIN_LENGHT and the pass of the solver.
+Entries older than MAX_AGE are dropped, and only the MAX_ENTRIES most recently used are kept.
+    """
+import hashlib
+import json
+import pathlib
+from time import time
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+PATH = pathlib.Path(__file__).parent.parent.absolute()
+CACHE_PATH = PATH.joinpath("assets").joinpath("cache").joinpath("solutions")
+
+MAX_ENTRIES = 64
+MAX_AGE = 30*24*3600        #seconds
+
+def solve_key(board:list, fingerprint:str, min_length:int, *extra):
+    """Key of a solution.
+
+    Args:
+        board (list): board as list of strings (the rows)
+        fingerprint (str): fingerprint of the dictionary
+        min_length (int): minimum lenght of the words
+        extra: anything else the solution depends on (e.g. the pass of the solver)
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([list(board), fingerprint, min_length, [str(e) for e in extra]]).encode())
+    return digest.hexdigest()
+
+def _entry(key:str):
+    return CACHE_PATH.joinpath("{0}.json".format(key))
+
+def get(key:str):
+    """Cached solution of key, None if missing or expired.
+
+    Returns:
+        dict: "words": list of words, "paths": word: path of (row, column), or None if not stored
+    """
+    path = _entry(key)
+    try:
+        if time()-path.stat().st_mtime > MAX_AGE:
+            path.unlink()
+            return None
+        with open(path, "r") as f:
+            data = json.load(f)
+        path.touch()            #most recently used
+        message = "Solution of {0} words read from cache".format(len(data["words"]))
+        logger.info(message)
+        return data
+    except FileNotFoundError:
+        return None
+    except:
+        logger.warning("Cached solution unreadable", exc_info=True)
+        return None
+
+def put(key:str, words, paths:dict = None):
+    """Store a solution and evict old entries.
+
+    Args:
+        key (str): key of the solution (see solve_key)
+        words (iterable): words found
+        paths (dict, optional): word: path of (row, column), if the solver produced them. Defaults to None.
+    """
+    CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    path = _entry(key)
+    temp = path.with_suffix(".tmp")
+    try:
+        with open(temp, "w") as f:
+            json.dump({"words": sorted(words), "paths": paths, "created": time()}, f)
+        temp.replace(path)
+    except:
+        logger.error("Unable to cache solution", exc_info=True)
+        return
+    evict()
+
+def evict(max_entries:int = MAX_ENTRIES, max_age:float = MAX_AGE):
+    """Remove expired entries and the least recently used beyond max_entries.
+
+    Returns:
+        int: number of entries removed
+    """
+    entries = sorted(CACHE_PATH.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    now = time()
+    removed = 0
+    for i, path in enumerate(entries):
+        if i >= max_entries or now-path.stat().st_mtime > max_age:
+            path.unlink(missing_ok=True)
+            removed += 1
+    if removed:
+        message = "Evicted {0} cached solutions".format(removed)
+        logger.debug(message)
+    return removed
@@ -1,4 +1,5 @@
 import pathlib
+from time import time
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.common.keys import Keys
@@ -10,6 +11,7 @@ from Squardle.src.LocalStorage import LocalStorage as LS
 from Luca.logger import LucaLogger
 logger = LucaLogger(__name__)
 PATH = pathlib.Path(__file__).parent.parent.absolute()
+URL = "https://squaredle.app/"
 
 #setup
 def setup(_headless = True):
@@ -23,7 +25,7 @@ def setup(_headless = True):
         else:
             driver = webdriver.Firefox()
             logger.info("Headbound WebDriver Initiated")
-        driver.get("https://squaredle.app/")
+        driver.get(URL)
         message = "WebDriver Connected with {0}".format(driver.title)
         logger.critical(message)
         _set_localstorage(driver)
@@ -47,6 +49,7 @@ def _set_localstorage(driver):
 
     #refresh driver
     driver.refresh()
+    watch_popups(driver)
 
 #get uuid of session
 def get_uuid(driver):
@@ -135,6 +138,75 @@ def signin(driver,credentials):#make it more stable
 
     #refresh page
     driver.refresh()
+    watch_popups(driver)
+
+def reload(driver):
+    """Load the board of the day again on a signed in driver kept open between runs (see daemon)"""
+    driver.get(URL)
+    watch_popups(driver)
+
+def healthy(driver, credentials):
+    """Check that the driver answers, the page is loaded and the session is still signed in"""
+    try:
+        ready = driver.execute_script("return document.readyState") == "complete"
+        return ready and get_uuid(driver) == credentials["uuid"]
+    except:
+        logger.warning("WebDriver not responding", exc_info=True)
+        return False
+
+#page-side observer recording the popups that open, so that the bot doesn't have to poll them
+WATCH_SCRIPT = """
+if (!window.squardleBotPopups) {
+    var state = window.squardleBotPopups = {opened: []};
+    var record = function(el) {
+        if (el.nodeType === 1 && el.classList.contains("popup") && getComputedStyle(el).display !== "none" && el.offsetParent !== null) {
+            state.opened.push(el.id || "");
+        }
+    };
+    new MutationObserver(function(mutations) {
+        mutations.forEach(function(m) {
+            if (m.type === "attributes") { record(m.target); }
+            m.addedNodes.forEach(record);
+        });
+    }).observe(document.body, {subtree: true, childList: true, attributes: true, attributeFilter: ["class", "style", "hidden", "open"]});
+    document.querySelectorAll(".popup").forEach(record);
+}
+return true;
+"""
+READ_SCRIPT = """
+var state = window.squardleBotPopups;
+if (!state) { return null; }
+var opened = state.opened;
+state.opened = [];
+return opened;
+"""
+
+def watch_popups(driver):
+    """Install the popup observer in the page. To be repeated after every refresh."""
+    try:
+        driver.execute_script(WATCH_SCRIPT)
+        logger.debug("Popup observer installed")
+    except:
+        logger.warning("Popup observer not installed", exc_info=True)
+
+def close_popups(driver):
+    """Read the popups opened since the last call from the observer and close them.
+    A single script call if no popup opened. If the observer is missing (e.g. after a refresh) it's installed again and all popups are checked.
+    Return the number of popups found open."""
+    try:
+        opened = driver.execute_script(READ_SCRIPT)
+    except:
+        opened = None
+    if opened is None:
+        watch_popups(driver)
+        popup_mgr(driver)
+        return 0
+    for name in dict.fromkeys(opened):
+        try:
+            popup_mgr(driver, driver.find_elements(By.ID, name) if name else [])
+        except:
+            logger.error("Pop Up was not closed", exc_info=True)
+    return len(opened)
 
 def popup_mgr(driver,pop_ups = []):
     if not(pop_ups):
@@ -151,19 +223,224 @@ def popup_mgr(driver,pop_ups = []):
                 logger.error("Pop Up was not closed")
             break
 
+#page-side search of the found-word counters, anchored on the max word count (see max_word): the first element with an id and an integer text
+#next to it is the count of the words found, an element with "bonus" in its id and an integer text is the count of the bonus words found.
+COUNTERS_SCRIPT = """
+var anchor = document.getElementById(arguments[0]), found = null, bonus = null;
+function counter(e) { return e !== anchor && /^\\s*\\d+\\s*$/.test(e.textContent); }
+for (var scope = anchor && anchor.parentElement, up = 0; scope && up < 3 && !found; scope = scope.parentElement, up++) {
+    scope.querySelectorAll("[id]").forEach(function(e) { if (!found && !/bonus/i.test(e.id) && counter(e)) { found = e.id; } });
+}
+document.querySelectorAll("[id]").forEach(function(e) { if (!bonus && /bonus/i.test(e.id) && counter(e)) { bonus = e.id; } });
+return {found: found, bonus: bonus};
+"""
+#page-side submission of a batch of words: each word is typed as key events on the page, one word every pacing ms.
+#Before each following word the found-word counters of the page are read again, to acknowledge if the word was accepted (1), accepted as bonus word (2),
+#not accepted (0), or unknown (-1, counters not readable).
+SUBMIT_SCRIPT = """
+var words = arguments[0], pacing = arguments[1], foundId = arguments[2], bonusId = arguments[3], done = arguments[arguments.length-1];
+var target = document.activeElement && document.activeElement !== document.body ? document.activeElement : document;
+function press(key) {
+    var code = key === "Enter" ? "Enter" : "Key" + key.toUpperCase();
+    target.dispatchEvent(new KeyboardEvent("keydown", {key: key, code: code, bubbles: true, cancelable: true}));
+    target.dispatchEvent(new KeyboardEvent("keyup", {key: key, code: code, bubbles: true, cancelable: true}));
+}
+function read(id) {
+    var e = id ? document.getElementById(id) : null;
+    var n = e ? parseInt(e.textContent, 10) : NaN;
+    return isNaN(n) ? -1 : n;
+}
+function counts() { return [read(foundId), read(bonusId)]; }
+var acks = [], i = 0, before = counts();
+function next() {
+    if (i > 0) {
+        var after = counts();
+        if (Math.min(before[0], before[1], after[0], after[1]) < 0) { acks.push(-1); }
+        else if (after[0] > before[0]) { acks.push(1); }
+        else if (after[1] > before[1]) { acks.push(2); }
+        else { acks.push(0); }
+        before = after;
+    }
+    if (i >= words.length) { done(acks); return; }
+    var word = words[i++];
+    for (var j = 0; j < word.length; j++) { press(word[j]); }
+    press("Enter");
+    setTimeout(next, pacing);
+}
+next();
+"""
+BULK_SUBMIT = True      #submit batches with SUBMIT_SCRIPT, else one ActionChains per word
+BATCH_SIZE = 50         #words per execute_script call
+PACING = 20             #ms between words of a batch, adapted while submitting
+MIN_PACING = 5          #fastest pacing tried
+SAFE_PACING = 150       #pacing of the words sent again, at which the page is assumed not to drop words
+PROBE = 3               #words not accepted in a batch sent again to check if the page dropped them
+MAX_COUNT_ID = "maxWordCount"   #element with the number of words of the board, anchor of the found-word counters (see find_counters)
+
+def find_counters(driver):
+    """Ids of the found-word counters of the page, read from the page next to the max word count (see COUNTERS_SCRIPT).
+
+    Returns:
+        dict: "found": id of the count of the words found, "bonus": id of the count of the bonus words found. None where not found
+    """
+    try:
+        counters = driver.execute_script(COUNTERS_SCRIPT, MAX_COUNT_ID) or dict()
+    except:
+        logger.error("Found-word counters not searched", exc_info=True)
+        counters = dict()
+    return {"found": counters.get("found"), "bonus": counters.get("bonus")}
+
+def submit_batch(driver, words:list, pacing:int = PACING, counters:dict = None):
+    """Type a batch of words with a single script call.
+
+    Args:
+        counters (dict, optional): ids of the found-word counters (see find_counters). Defaults to None, words not acknowledged.
+
+    Returns:
+        list: acknowledgement of each word, 1 accepted, 2 accepted as bonus word, 0 not accepted (rejected or dropped), -1 unknown (counters not readable)
+    """
+    counters = counters or dict()
+    driver.set_script_timeout(10+len(words)*pacing/1000)
+    return driver.execute_async_script(SUBMIT_SCRIPT, words, pacing, counters.get("found"), counters.get("bonus"))
+
+def found_count(driver, counter_id:str):
+    """Number shown by a found-word counter of the page (see find_counters), -1 if not readable"""
+    try:
+        return int(driver.find_element(By.ID,counter_id).text)
+    except:
+        return -1
+
 #write word attempts
-def attempt(driver, words, bonus_word, invalid_words):
-    popups = driver.find_elements(By.CLASS_NAME,"popup")
+def attempt(driver, words, bonus_word, invalid_words, bulk = BULK_SUBMIT, batch_size = BATCH_SIZE, pacing = PACING, stats = None, ranking = None, threshold = 0.0):
+    """Type the words in the board. Words can be any iterable, also a stream still being produced by the solver (see squardle_solver(stream=True)).
+    Duplicates, the bonus word and invalid words are skipped. The bonus word is typed last. Return the number of words typed.
+    With bulk the words are submitted in batches of batch_size with one script call each (see submit_batch).
+    If a batch fails, or a batch and its probe are all rejected while acknowledged (e.g. the page ignores the untrusted key events of the script), it and the remaining words are typed one by one with ActionChains.
+    Popups are read from the page observer (see close_popups) once per batch.
+    With a ranking (see word_ranking) a list of words is typed by descending score, a stream in the order it's produced;
+    words scored below threshold are not typed in either case.
+
+    Every bulk word is acknowledged against the found-word and bonus-word counters of the page (see find_counters), so an accepted bonus word isn't taken for a dropped one.
+    PROBE of the words not accepted while sending faster than SAFE_PACING are sent once more at SAFE_PACING: if some of them are accepted the page was dropping words,
+    all the others are sent again and pacing is doubled, otherwise pacing is reduced towards MIN_PACING. Words not accepted at SAFE_PACING, or not probed, are counted as rejected.
+    If either counter is missing from the page it's logged as critical: words are sent at a fixed pacing and counted as unacknowledged.
+    If stats is given it's filled with the counts (sent, accepted, bonus_accepted, rejected, unacknowledged, resent, recovered, below_threshold, found_delta),
+    whether the words were acknowledged,
+    the rates in words/sec (sent_rate, accepted_rate, rejected_rate), the final pacing, the elapsed seconds and the words submitted."""
     board = driver.find_element(By.CLASS_NAME,"letters")
     focus = ActionChains(driver).move_to_element(board)
-    for w in words:
-        if not(w==bonus_word or w in invalid_words):
-            if EC.visibility_of_any_elements_located(popups):
-                popup_mgr(driver,popups)
+    if stats is None:
+        stats = dict()
+    for key in ("sent", "accepted", "bonus_accepted", "rejected", "unacknowledged", "resent", "recovered", "below_threshold"):
+        stats[key] = 0
+    counters = find_counters(driver)
+    acknowledged = bool(bulk and counters["found"] and counters["bonus"])
+    if bulk and not acknowledged:
+        message = "Found-word counters not on the page ({0}): words not acknowledged, pacing not adapted".format(counters)
+        logger.critical(message)
+        counters = dict()
+    stats["acknowledged"] = acknowledged
+    start = time()
+    found_start = found_count(driver, counters["found"]) if acknowledged else -1
+    typed = set()
+    batch = []
+
+    def reconcile(ws, acks, speed, resending):
+        """Count the acknowledgements of a batch and return the words to send again"""
+        again = []
+        for w, ack in zip(ws, acks):
+            if ack == 1:
+                stats["accepted"] += 1
+                stats["recovered"] += resending
+            elif ack == 2:
+                stats["bonus_accepted"] += 1
+                stats["recovered"] += resending
+            elif ack == 0 and speed < SAFE_PACING and not resending:
+                again.append(w)
+            elif ack == 0:
+                stats["rejected"] += 1
+            else:
+                stats["unacknowledged"] += 1
+        stats["unacknowledged"] += max(len(ws)-len(acks), 0)
+        return again
+
+    def send_again(ws):
+        reconcile(ws, submit_batch(driver, ws, SAFE_PACING, counters), SAFE_PACING, True)
+        stats["sent"] += len(ws)
+        stats["resent"] += len(ws)
+
+    def type_words(ws):
+        nonlocal bulk, pacing
+        if bulk:
+            close_popups(driver)
+            try:
+                speed = pacing
+                taken = stats["accepted"]+stats["bonus_accepted"]
+                rejected = stats["rejected"]
+                again = reconcile(ws, submit_batch(driver, ws, speed, counters), speed, False)
+                stats["sent"] += len(ws)
+                recovered = stats["recovered"]
+                #probe a few of the words not accepted, all of them only if the probe shows the page dropped words
+                probe, rest = again[:PROBE], again[PROBE:]
+                if probe:
+                    send_again(probe)
+                    if stats["recovered"] > recovered:
+                        send_again(rest)
+                    else:
+                        stats["rejected"] += len(rest)
+                if stats["recovered"] > recovered:
+                    pacing = min(pacing*2, SAFE_PACING)
+                    message = "Page dropped {0} words, pacing raised to {1}ms".format(stats["recovered"]-recovered, pacing)
+                    logger.info(message)
+                elif acknowledged and stats["accepted"]+stats["bonus_accepted"] == taken and stats["rejected"]-rejected == len(ws):
+                    message = "Batch of {0} words and its probe all rejected: the page may ignore the submitted keys, words typed one by one".format(len(ws))
+                    logger.warning(message)
+                    stats["rejected"] = rejected
+                    bulk = False
+                elif acknowledged:
+                    pacing = max(pacing-max(pacing//4, 1), MIN_PACING)
+                if bulk:
+                    return
+            except:
+                logger.error("Bulk submission failed, words typed one by one", exc_info=True)
+                bulk = False
+        for w in ws:
+            close_popups(driver)
             focus.send_keys(w,Keys.ENTER).perform()
+            stats["sent"] += 1
+            stats["unacknowledged"] += 1
+
+    cutoff = ranking is not None and threshold > 0
+    if ranking is not None and hasattr(words, "__len__"):
+        ranked = ranking.rank(words, threshold)
+        stats["below_threshold"] = len(words)-len(ranked)
+        words = ranked
+        cutoff = False
+    for w in words:
+        if cutoff and ranking.score(w) < threshold:
+            stats["below_threshold"] += 1
+            continue
+        if not(w==bonus_word or w in invalid_words or w in typed):
+            typed.add(w)
+            batch.append(w)
+            if len(batch) >= (batch_size if bulk else 1):
+                type_words(batch)
+                batch = []
         else:
             continue
-    focus.send_keys(bonus_word, Keys.ENTER).perform()
+    type_words(batch+[bonus_word])
+
+    elapsed = max(time()-start, 1e-9)
+    found_end = found_count(driver, counters["found"]) if acknowledged else -1
+    stats["found_delta"] = found_end-found_start if found_start >= 0 and found_end >= 0 else -1
+    stats["elapsed"] = elapsed
+    stats["pacing"] = pacing
+    stats["words"] = sorted(typed)+[bonus_word]
+    for key in ("sent", "accepted", "rejected"):
+        stats[key+"_rate"] = stats[key]/elapsed
+    message = "Sent {sent} words ({sent_rate:.1f}/s): {accepted} accepted ({accepted_rate:.1f}/s), {bonus_accepted} bonus, {rejected} rejected ({rejected_rate:.1f}/s), {unacknowledged} unacknowledged, {recovered}/{resent} resent words recovered".format(**stats)
+    logger.info(message)
+    return len(typed)
 
 # def getLeaderboard(driver, bonus = True, speed = False, accuracy=False):
 #     #get Leaderboards
@@ -174,4 +451,4 @@ def getTime(driver):
     return driver.find_element(By.ID,"timer").text
 
 def max_word(driver):
-    return driver.find_element(By.ID,"maxWordCount").text
\ No newline at end of file
+    return driver.find_element(By.ID,MAX_COUNT_ID).text
\ No newline at end of file
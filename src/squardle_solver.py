@@ -1,14 +1,34 @@
 from string import ascii_lowercase
+from collections import Counter
 from tqdm import tqdm
 import pathlib
 from Luca.utils import yes
 from Squardle.src.board_parser import *
-from time import time
+import Squardle.src.word_store as WS
+import Squardle.src.dawg as DG
+import Squardle.src.solve_cache as SC
+import Squardle.src.exclusions as EX
+try:
+    import Squardle.src.word_matrix as WM
+except ImportError:
+    WM = None       #numpy not installed, filters run in python
+from time import time, perf_counter
+from functools import lru_cache
+import multiprocessing
+import os
+import queue
+import threading
 from Luca.logger import LucaLogger
 logger = LucaLogger(__name__)
 
 MIN_LENGHT = 4
+END = "$"          #trie key of the nodes closing a word
 PROPER_NOUN = []
+WORKERS = os.cpu_count() or 1       #processes of the parallel solver, when asked for (it's opt-in, see parallel_search)
+CHECK_EVERY = 1024                  #cells pushed by the search between two checks of the deadline
+VERIFY_LIMIT = 300                  #pruned candidate lists up to this size are verified word by word instead of searching the board (see word_driven)
+SPLIT_CELLS = 25                    #boards bigger than this are split by subtree in the parallel solver
+_SHARED = {}                        #graph and index inherited by the workers of the parallel solver
 PATH = pathlib.Path(__file__).parent.parent.absolute()
 
 def neighbours(row:int, col:int, shape:tuple, matrix:list):
@@ -53,67 +73,148 @@ def make_matrix(board:list):
         logger.error("No Matrix available for prosecution of program")
     return result
 
-def dictionary_maker(list1 = True, json_l = True, mill_list = True, given_word_list=[]):
+def compile_board(matrix:list):
+    """Compile the matrix of make_matrix in a graph of integer cells.
+    Cell (r,c) gets id r*columns+c. Empty cells keep their id with a blank letter and no neighbours.
+
+    Args:
+        matrix (list): matrix of the board with neighbours, as given by make_matrix
+
+    Returns:
+        tuple: letters of the cells by id, adjacency table of the cells by id (tuple of neighbour ids)
+    """
+    columns = len(matrix[0])
+    letters = [cell[0] for row in matrix for cell in row]
+    adjacency = [tuple(r*columns+c for r,c in cell[1]) for row in matrix for cell in row]
+    return letters, adjacency
+
+@lru_cache(maxsize=8)
+def _compiled_board(rows:tuple):
+    matrix = make_matrix(list(rows))
+    return matrix, compile_board(matrix)
+
+def board_graph(board:list):
+    """Matrix (see make_matrix) and compiled graph (see compile_board) of the board.
+    They are memoized, so the passes of the solver on the same board compile it once."""
+    return _compiled_board(tuple(board))
+
+def dictionary_maker(list1 = True, json_l = True, mill_list = True, given_word_list=[], compact = False):
     """List of all words that will be checked against by the solver.
-    Retrieve words from saved files and make a set of all the available words.
+    Open the compiled artifact of the selected word lists (see word_store), which is rebuilt only when a list changes.
 
     Args:
         list1 (bool, optional): Smallest list of possible 4-15-long words. Parse from Wordfinderx. Defaults to True.
         json_l (bool, optional): Other list of possible 4+ words. Given by Matteo . Defaults to True.
         mill_list (bool, optional): 1.5 million words of lengh 1+. Given by Matteo. Defaults to True.
+        given_word_list (list, optional): Additional words to merge in the result. Defaults to [].
+        compact (bool, optional): Return the minimal automaton of the lists (see dawg) for low-memory hosts. given_word_list is ignored. Defaults to False.
 
     Returns:
-        List: List of unique words of lengh 4 or more
+        List: Sorted unique words of lengh 4 or more. Memory mapped sequence if no words are given.
     """
-    WORD_PATH = PATH.joinpath("assets").joinpath("words")
-    wordfinder_link = WORD_PATH.joinpath("words_list.txt")
-    json_link = WORD_PATH.joinpath("json_list.txt")
-    million_link = WORD_PATH.joinpath("wlist_match1.txt")
-    word_list = []
-    if list1:
-        try:
-            with open(wordfinder_link, "r") as f:
-                word_list.extend(tqdm([line.rstrip() for line in f.readlines()]))
-            logger.debug("Wordfinderx List Uploaded")
-        except:
-            logger.warning("Wordfinderx List not available")
-    if json_l:
+    if compact:
         try:
-            with open(json_link, "r") as f:
-                word_list.extend(tqdm([line.rstrip() for line in f.readlines()]))
-            logger.debug("Json List Uploaded")
+            word_list = DG.load_dawg(list1=list1, json_l=json_l, mill_list=mill_list)
+            logger.info(repr(word_list))
+            return word_list
         except:
-            logger.warning("Json List not available")
-    if mill_list:
-        try:
-            with open(million_link,"r") as f:
-                word_list.extend(tqdm([line.rstrip() for line in f.readlines() if line.rstrip().isalpha() and len(line)>4]))
-            logger.debug("Million and a Half List Uploaded")
-        except:
-            logger.warning("Million and a Half List not available")
-    word_list.extend(given_word_list)
-    word_list = set(word_list)
-    word_list = sorted([w for w in word_list])
+            logger.error("Compact dictionary not available, falling back to the word list", exc_info=True)
+    try:
+        word_list = WS.load_dictionary(list1=list1, json_l=json_l, mill_list=mill_list)
+    except:
+        logger.error("Compiled dictionary not available", exc_info=True)
+        word_list = []
+    if given_word_list:
+        word_list = sorted(set(word_list).union(given_word_list))
     message = "Word List is of size {0} words".format(len(word_list))
     logger.info(message)
     return word_list
 
+def prune_dictionary(matrix:list, dictionary):
+    """Drop in bulk the words that can't be traced on the board, before any search.
+    A word is dropped if it has a pair of consecutive letters that are never adjacent on the board (this covers letters missing from the board),
+    or if it needs more copies of a letter than the board has.
+    Compiled word lists are filtered with vectorized operations on their NumPy encoding, when NumPy is available (see word_matrix).
+
+    Args:
+        matrix (list): matrix of the board with neighbours, as given by make_matrix
+        dictionary (list): list of words as given by dictionary_maker
+
+    Returns:
+        tuple: list of the words left, number of words dropped
+    """
+    letters = Counter(cell[0] for row in matrix for cell in row if cell[0] in ascii_lowercase)
+    bigrams = {cell[0]+matrix[r][c][0] for row in matrix for cell in row for r,c in cell[1]}
+    if WM is not None and isinstance(dictionary, WS.MappedWords):
+        try:
+            words = WM.load_matrix(dictionary)
+            pruned = words.select(words.min_length(MIN_LENGHT) & words.fits_counts(letters) & words.fits_bigrams(bigrams))
+            dropped = len(words)-len(pruned)
+            message = "Pruning dropped {0} of {1} words that can't be traced on the board".format(dropped, len(words))
+            logger.info(message)
+            return pruned, dropped
+        except:
+            logger.error("Vectorized pruning failed, words filtered one by one", exc_info=True)
+    pruned = []
+    total = 0
+    for word in dictionary:
+        total += 1
+        if len(word) == 1:
+            if word not in letters:
+                continue
+        elif not all(word[i:i+2] in bigrams for i in range(len(word)-1)):
+            continue
+        if len(set(word)) < len(word) and any(word.count(l) > letters[l] for l in set(word)):
+            continue
+        pruned.append(word)
+    dropped = total-len(pruned)
+    message = "Pruning dropped {0} of {1} words that can't be traced on the board".format(dropped, total)
+    logger.info(message)
+    return pruned, dropped
+
+def make_trie(dictionary:list):
+    """Build a prefix trie of the word list. Each node is a dictionary of letters pointing to the following nodes.
+    A node that closes a word holds the word itself under the END key.
+
+    Args:
+        dictionary (list): list of words as given by dictionary_maker
+
+    Returns:
+        dict: root node of the trie
+    """
+    trie = dict()
+    for word in dictionary:
+        node = trie
+        for letter in word:
+            node = node.setdefault(letter, {})
+        node[END] = word
+    message = "Trie built from {0} words".format(len(dictionary))
+    logger.debug(message)
+    return trie
+
+def make_index(dictionary):
+    """Root node to walk the dictionary in the solver: a trie is used as is, a dawg.Dawg is walked through its root, a list is made a trie."""
+    if isinstance(dictionary, dict):
+        return dictionary
+    if isinstance(dictionary, DG.Dawg):
+        return dictionary.root()
+    return make_trie(dictionary)
+
 def recursive_words(curr_word, trail, matrix, found_words:set, dictionary):
     """Recursive Function that allows to check for all possible words.
     Given a certain cell, it looks at all possible neighbours. Avoid the ones that are currently in use.
-    It checks if the current word(4+) allows for any possible word in 'dictionary'.
-    If a match is found the word is added to the results.
-    If the dictionary show further possible words, the function calls itself back connecting itself to the neighbours.
+    The trie node of the current word is checked: if it closes a word (4+) the word is added to the results.
+    The function then calls itself back on the neighbours whose letter is a child of the current node.
 
-    If no neighbours are found left then the function returns 0 and 'steps back' in the recursive calls.
-    If no possible words are left in the dictionary matching the current word the function returns 0 and 'steps back' in the recursive calls.
+    If no neighbours are found left then the function returns and 'steps back' in the recursive calls.
+    If no child of the node matches a neighbour the branch ends as no possible words are left in the dictionary.
 
     Args:
         curr_word (_type_): Current word being created and check by the recursive calls.
         trail (_type_): List of all visited cells that are forming the curren word being checked. This avoid double counting the same cell as this is not allowed.
         matrix (_type_): Grid in which the recursive function if operating. Each cell is a list of the letter contained and all possible neighbours to which the recursive function may connect.
         found_words (set): set of all matching words that have been found. No duplicates.
-        dictionary (_type_): Current selection of the dictionary. The list is filtered to only have word beginning with the current word being checked.
+        dictionary (dict): Trie node reached by the current word (or the equivalent dawg.DawgNode). Its children are the letters that continue to possible words.
 
     Returns:
         set: set of all possible words found in the board.
@@ -121,30 +222,16 @@ def recursive_words(curr_word, trail, matrix, found_words:set, dictionary):
     r = trail[-1][0]
     c = trail[-1][1]
 
-    size = len(curr_word)
-    
-    try:
-        if len(dictionary):                     #check enough words left
-            if size >= MIN_LENGHT:    #check for words if len is >3
-                filtered_dictionary = [word for word in dictionary if word[:size] == curr_word]
-                for word in filtered_dictionary:
-                    if len(word) == size:
-                        found_words.add(word)
-            else:
-                filtered_dictionary = dictionary
-        else:
-            return found_words
-    except:
-        message = "Error encountered while filtering word list at trail: {0}".format(trail)
-        logger.error(message)
-        return found_words
+    if END in dictionary and len(curr_word) >= MIN_LENGHT:     #check for words if len is >3
+        found_words.add(curr_word)
     
     for i in matrix[r][c][1]:
-        try:    
-            if i not in trail:
+        try:
+            node = dictionary.get(matrix[i[0]][i[1]][0])
+            if node is not None and i not in trail:
                 trailer = trail + [i]
                 foll_word = curr_word + matrix[i[0]][i[1]][0]
-                found_words = recursive_words(foll_word, trailer, matrix, found_words, filtered_dictionary)
+                found_words = recursive_words(foll_word, trailer, matrix, found_words, node)
             else:
                 continue
         except:
@@ -152,27 +239,270 @@ def recursive_words(curr_word, trail, matrix, found_words:set, dictionary):
             logger.error(message)
     return found_words
 
-def board_solver(board:list, dictionary:list,verbose=False):
-    """Initiate the recursive function to find all possible words in the board.
+def trace_words(graph:tuple, index, starts = None, deadline = None):
+    """Iterative depth first search of all the words of the index that can be traced on the board graph.
+    Words are yielded as soon as they are found. The same word is yielded once for each path tracing it.
+    The visited cells are an integer bitmask and the current word a list of letters updated in place, so no copies are made while walking.
+    The explicit stack removes any recursion limit.
+
+    Args:
+        graph (tuple): letters and adjacency of the cells, as given by compile_board
+        index (_type_): root node of the dictionary, as given by make_index
+        starts (iterable, optional): ids of the cells to start from, or tuples of ids of adjacent cells to search only the subtree of that path. Defaults to all cells.
+        deadline (float, optional): time.perf_counter() value after which the search stops, checked every CHECK_EVERY cells pushed. Defaults to None, no limit.
+
+    Yields:
+        str: found word
+
+    Returns:
+        bool: True if the search was complete, False if stopped by the deadline (value of yield from)
+    """
+    letters, adjacency = graph
+    pushed = 0
+    if starts is None:
+        starts = range(len(letters))
+    for start in starts:
+        path = (start,) if isinstance(start, int) else start
+        node = index
+        word = []
+        visited = 0
+        for cell in path:
+            node = node.get(letters[cell])
+            if node is None:
+                break
+            word.append(letters[cell])
+            visited |= 1 << cell
+        if node is None:
+            continue
+        if END in node and len(word) >= MIN_LENGHT:
+            yield "".join(word)
+        stack = [(path[-1], node, iter(adjacency[path[-1]]))]
+        while stack:
+            cell, node, neighbours_left = stack[-1]
+            for following in neighbours_left:
+                if visited >> following & 1:
+                    continue
+                child = node.get(letters[following])
+                if child is None:
+                    continue
+                visited |= 1 << following
+                word.append(letters[following])
+                if END in child and len(word) >= MIN_LENGHT:
+                    yield "".join(word)
+                stack.append((following, child, iter(adjacency[following])))
+                pushed += 1
+                if deadline is not None and not pushed % CHECK_EVERY and perf_counter() > deadline:
+                    return False
+                break
+            else:
+                stack.pop()
+                visited ^= 1 << cell
+                word.pop()
+    return True
+
+def search_words(graph:tuple, index, found_words:set, starts = None):
+    """Add to found_words all the words of the index that can be traced on the board graph (see trace_words).
+
+    Args:
+        graph (tuple): letters and adjacency of the cells, as given by compile_board
+        index (_type_): root node of the dictionary, as given by make_index
+        found_words (set): set the found words are added to
+        starts (iterable, optional): ids of the cells to start from, or tuples of ids of adjacent cells. Defaults to all cells.
+
+    Returns:
+        set: found_words
+    """
+    found_words.update(trace_words(graph, index, starts))
+    return found_words
+
+def _search_task(starts):
+    """Worker task of the parallel solver. Graph and index are inherited from the parent process."""
+    return search_words(_SHARED["graph"], _SHARED["index"], set(), starts=starts)
+
+def parallel_search(graph:tuple, index, workers:int = WORKERS):
+    """Search the board graph fanning out the start cells across a pool of processes.
+    The graph and the index are shared with the workers once through fork inheritance, so nothing but the start cells and the found words is pickled.
+    Boards with more than SPLIT_CELLS cells are split in the subtrees of the first step, to balance the few heavy start cells.
+    Opt-in (board_solver and squardle_solver search in a single process by default): the speedup hasn't been measured on a multi-core host yet.
+    Measure it with benchmark.parallel_speedup before turning it on.
+
+    Args:
+        graph (tuple): letters and adjacency of the cells, as given by compile_board
+        index (_type_): root node of the dictionary, as given by make_index
+        workers (int, optional): number of processes. Defaults to WORKERS.
+
+    Returns:
+        set: found words
+    """
+    letters, adjacency = graph
+    if len(letters) > SPLIT_CELLS:
+        tasks = [((cell, following),) for cell in range(len(letters)) for following in adjacency[cell]]
+    else:
+        tasks = [(cell,) for cell in range(len(letters))]
+    try:
+        context = multiprocessing.get_context("fork")
+    except ValueError:
+        logger.warning("Fork not available, board solved in a single process")
+        return search_words(graph, index, set())
+    words = set()
+    _SHARED["graph"] = graph
+    _SHARED["index"] = index
+    try:
+        with context.Pool(workers) as pool:
+            for found in tqdm(pool.imap_unordered(_search_task, tasks), total=len(tasks)):
+                words.update(found)
+    finally:
+        _SHARED.clear()
+    return words
+
+def prepare_search(board:list, dictionary, exclude = ()):
+    """Compiled graph of the board and candidate words to search in it.
+    Word lists are pruned against the board (see prune_dictionary) and the words in exclude are removed.
+    A trie or dawg.Dawg is searched whole, the words in exclude are removed from the words found instead (see late_exclusion).
 
     Args:
         board (list): board of the day
-        dictionary (list): list of all the words.
+        dictionary (list): list of all the words, or an already built trie or dawg.Dawg (these are used as they are)
+        exclude (optional): collection of words not to search, e.g. already searched in a previous pass. Defaults to ().
+
+    Returns:
+        tuple: graph, candidates (list of words, or the given trie or dawg.Dawg)
+    """
+    matrix, graph = board_graph(board)
+    if not isinstance(dictionary, (dict, DG.Dawg)):
+        dictionary, _ = prune_dictionary(matrix, dictionary)
+        if exclude:
+            size = len(dictionary)
+            dictionary = [w for w in dictionary if w not in exclude]
+            message = "{0} words left to search after excluding {1} already searched".format(len(dictionary), size-len(dictionary))
+            logger.info(message)
+    return graph, dictionary
+
+def late_exclusion(candidates, exclude = ()):
+    """Words to remove from the words found: exclude if candidates is a trie or dawg.Dawg, which prepare_search can't filter, else nothing"""
+    return exclude if isinstance(candidates, (dict, DG.Dawg)) else ()
+
+@lru_cache(maxsize=8)
+def _board_positions(rows:tuple):
+    matrix, (letters, adjacency) = _compiled_board(rows)
+    positions = dict()
+    for cell, letter in enumerate(letters):
+        if letter in ascii_lowercase:
+            positions.setdefault(letter, []).append(cell)
+    steps = []
+    for cell in range(len(letters)):
+        following = dict()
+        for neighbour in adjacency[cell]:
+            following.setdefault(letters[neighbour], []).append(neighbour)
+        steps.append(following)
+    return positions, steps
+
+def trace_word(positions:dict, steps:list, word:str):
+    """Path of cell ids tracing word on the board, None if it can't be traced.
+    Only the neighbours holding the next letter of the word are tried, so a word with a missing letter or pair of letters fails at once.
+
+    Args:
+        positions (dict): ids of the cells of each letter
+        steps (list): for each cell, ids of the adjacent cells of each letter
+        word (str): word to trace
+
+    Returns:
+        list: cell ids of the path
+    """
+    last = len(word)-1
+    for start in positions.get(word[0], ()):
+        path = [start]
+        if not last:
+            return path
+        visited = 1 << start
+        stack = [iter(steps[start].get(word[1], ()))]
+        while stack:
+            for following in stack[-1]:
+                if not visited >> following & 1:
+                    path.append(following)
+                    if len(path) > last:
+                        return path
+                    visited |= 1 << following
+                    stack.append(iter(steps[following].get(word[len(path)], ())))
+                    break
+            else:
+                stack.pop()
+                visited ^= 1 << path.pop()
+    return None
+
+def verify_words(board:list, words):
+    """Word-driven search: check each candidate word directly on the board (see trace_word) and return the path tracing it.
+
+    Args:
+        board (list): board as list of strings (the rows)
+        words (iterable): candidate words
+
+    Returns:
+        dict: traceable word: path as list of (row, column)
+    """
+    rows = tuple(board)
+    matrix, graph = _compiled_board(rows)
+    positions, steps = _board_positions(rows)
+    columns = len(matrix[0])
+    result = dict()
+    for word in words:
+        if len(word) < MIN_LENGHT or word in result:
+            continue
+        path = trace_word(positions, steps, word)
+        if path is not None:
+            result[word] = [divmod(cell, columns) for cell in path]
+    return result
+
+def word_driven(candidates):
+    """True if the candidates are a word list short enough to verify word by word faster than searching the board.
+    Measured on random 4x4 to 8x8 boards with pruned candidates: verify_words ties or beats trie build plus search up to ~300 words, and is slower from ~1000."""
+    return isinstance(candidates, list) and len(candidates) <= VERIFY_LIMIT
+
+def board_solver(board:list, dictionary:list,verbose=False, workers=1, exclude=(), verify=False):
+    """Initiate the search of all possible words in the board over its compiled graph (see search_words).
+
+    Args:
+        board (list): board of the day
+        dictionary (list): list of all the words, pruned against the board before the search (see prune_dictionary). An already built trie (see make_trie) or a dawg.Dawg is also accepted.
         verbose (bool, optional): Receive info about the result of the search. Number of words found and Optional list of the words found. Defaults to False.
+        workers (int, optional): Number of processes the start cells are distributed across (see parallel_search). Defaults to 1.
+        exclude (optional): collection of words not to search (see prepare_search). Defaults to ().
+        verify (bool, optional): Always check the candidates one by one on the board (see verify_words) instead of searching it, and return their paths. A word list only.
+            Without it, pruned lists up to VERIFY_LIMIT words are verified anyway (see word_driven) and only the words are returned. Defaults to False.
 
     Returns:
-        List: All the words found in the board. No duplicates.
+        List: All the words found in the board. No duplicates. Dict of word: path of (row, column) if verify.
     """
-    #initiate recurive function to search for all possible words
-    matrix = make_matrix(board)
+    graph, candidates = prepare_search(board, dictionary, exclude)
     words = set()
-    for r in tqdm(range(len(matrix))):
-        for c in tqdm(range(len(matrix[0]))):
+    solved = False
+    if (verify and isinstance(candidates, list)) or word_driven(candidates):
+        words = verify_words(board, candidates)
+        if not verify:
+            words = set(words)
+        message = "Board solved word-driven on {0} candidates".format(len(candidates))
+        logger.info(message)
+        solved = True
+    else:
+        trie = make_index(candidates)
+    if not solved and workers > 1:
+        try:
+            words = parallel_search(graph, trie, workers)
+            solved = True
+        except:
+            logger.error("Parallel solver failed, board solved in a single process", exc_info=True)
+    #initiate search of all possible words from every cell
+    if not solved:
+        for cell in tqdm(range(len(graph[0]))):
             try:
-                words = recursive_words(matrix[r][c][0],[(r,c)], matrix, words, dictionary)
+                words = search_words(graph, trie, words, starts=(cell,))
             except:
-                message = "Error encountered in position ({0},{1}), letter {2} with initiated recursive solver".format(r,c,matrix[r][c][0])
-    
+                message = "Error encountered in cell {0}, letter {1} with initiated solver".format(cell,graph[0][cell])
+                logger.error(message)
+    excluded = late_exclusion(candidates, exclude)
+    if excluded:
+        words = {w for w in words if w not in excluded}
+
     message = "Solver found {0} words suitable for the board".format(len(words))
     logger.info(message)
 
@@ -185,51 +515,278 @@ def board_solver(board:list, dictionary:list,verbose=False):
     
     return words
 
-def invalid_words():
-    """Retrieves list of proper nouns that squardle does not accept.
+def search_plan(graph:tuple, candidates):
+    """Subtrees of the first step of the search (start cell and its neighbour), most promising first.
+    A subtree is as promising as the number of candidate words beginning with its two letters.
 
-    TODO: check that nouns list hasn't changed.
-    https://squaredle.app/api/static/names-short.csv
+    Args:
+        graph (tuple): letters and adjacency of the cells, as given by compile_board
+        candidates (list): candidate words. For a trie or dawg.Dawg the subtrees are kept in board order.
 
     Returns:
-        List: of proper nouns
+        tuple: list of (promise, (cell, following)) in order of search, Counter of the candidates by their first two letters
     """
-    nouns_link = PATH.joinpath("assets").joinpath("proper_noun.txt")
+    letters, adjacency = graph
+    prefixes = Counter(w[:2] for w in candidates) if isinstance(candidates, list) else Counter()
+    plan = [(prefixes[letters[cell]+letters[following]], (cell, following)) for cell in range(len(letters)) for following in adjacency[cell]]
+    if prefixes:
+        plan = [task for task in plan if task[0]]
+        plan.sort(key=lambda task: task[0], reverse=True)
+    return plan, prefixes
+
+def anytime_words(graph:tuple, candidates, deadline:float, stats:dict):
+    """Search the subtrees of search_plan in order until the deadline, yielding words as they are found (repeated for each path).
+    The deadline is also checked inside the subtrees (see trace_words), so a single heavy subtree can't overrun it.
+    When the generator ends stats is filled with the coverage of the search:
+        subtrees, explored, unexplored: number of subtrees planned, searched to the end and left out or cut short
+        unexplored_words: candidates whose first two letters were not searched from any cell
+        complete: True if the whole board was searched
+
+    Args:
+        graph (tuple): letters and adjacency of the cells, as given by compile_board
+        candidates (list): candidate words, or trie or dawg.Dawg
+        deadline (float): time.perf_counter() value after which the search stops
+        stats (dict): filled with the coverage stats
+
+    Yields:
+        str: found word
+    """
+    plan, prefixes = search_plan(graph, candidates)
+    index = make_index(candidates)
+    letters = graph[0]
+    explored = 0
+    searched = set()
     try:
-        with open(nouns_link,"r") as f:
-            return [word.rstrip() for word in f.readlines()]
+        for promise, path in plan:
+            if perf_counter() > deadline:
+                break
+            if not (yield from trace_words(graph, index, starts=(path,), deadline=deadline)):
+                break
+            explored += 1
+            searched.add(letters[path[0]]+letters[path[1]])
+    finally:
+        stats["subtrees"] = len(plan)
+        stats["explored"] = explored
+        stats["unexplored"] = len(plan)-explored
+        stats["unexplored_words"] = sum(count for prefix,count in prefixes.items() if prefix not in searched)
+        stats["complete"] = explored == len(plan)
+        message = "Search explored {0}/{1} subtrees, {2} candidate words left unexplored".format(explored, len(plan), stats["unexplored_words"])
+        logger.info(message)
+
+def anytime_solver(board:list, dictionary:list, budget:float, exclude=()):
+    """Solve the board within a wall-clock budget, searching the most promising subtrees first (see search_plan).
+    When the budget expires the words found so far are returned with the coverage of the search (see anytime_words).
+
+    Args:
+        board (list): board of the day
+        dictionary (list): list of all the words, or an already built trie or dawg.Dawg (see board_solver).
+        budget (float): seconds available, preparation of the search included
+        exclude (optional): collection of words not to search (see prepare_search). Defaults to ().
+
+    Returns:
+        tuple: set of found words, dict of coverage stats (with the elapsed seconds)
+    """
+    start = perf_counter()
+    graph, candidates = prepare_search(board, dictionary, exclude)
+    stats = dict()
+    excluded = late_exclusion(candidates, exclude)
+    words = {w for w in anytime_words(graph, candidates, start+budget, stats) if w not in excluded}
+    stats["elapsed"] = perf_counter()-start
+    message = "Solver found {0} words in {1:.2f}s of a {2}s budget".format(len(words), stats["elapsed"], budget)
+    logger.info(message)
+    return words, stats
+
+def board_solver_stream(board:list, dictionary:list, exclude=(), budget=None, stats=None):
+    """Streaming variant of board_solver: yield each word as soon as the search finds it. No duplicates.
+
+    Args:
+        board (list): board of the day
+        dictionary (list): list of all the words, or an already built trie or dawg.Dawg (see board_solver).
+        exclude (optional): collection of words not to search (see prepare_search). Defaults to ().
+        budget (float, optional): seconds after which the search stops, most promising subtrees searched first (see anytime_words). Defaults to None, no limit.
+        stats (dict, optional): filled with the coverage of the search (see anytime_words) when the stream ends, "complete" only if no budget. Defaults to None.
+
+    Yields:
+        str: found word
+    """
+    if stats is None:
+        stats = dict()
+    deadline = perf_counter()+budget if budget else None
+    graph, candidates = prepare_search(board, dictionary, exclude)
+    if deadline is not None:
+        found = anytime_words(graph, candidates, deadline, stats)
+    elif word_driven(candidates):
+        stats["complete"] = True
+        found = verify_words(board, candidates)
+    else:
+        stats["complete"] = True
+        found = trace_words(graph, make_index(candidates))
+    excluded = late_exclusion(candidates, exclude)
+    words = set()
+    for word in found:
+        if word not in words and word not in excluded:
+            words.add(word)
+            yield word
+    message = "Solver found {0} words suitable for the board, search {1}".format(len(words), "complete" if stats.get("complete") else "stopped by the budget")
+    logger.info(message)
+
+def background_stream(words, maxsize:int = 0):
+    """Consume an iterable of words in a background thread, feeding a queue.
+    The returned generator reads from the queue, so the words can be used while they are still being produced (e.g. typed while the search runs).
+    An exception in the producer is logged and ends the stream.
+
+    Args:
+        words (iterable): producer of words, e.g. board_solver_stream
+        maxsize (int, optional): maximum size of the queue, 0 for unbounded. Defaults to 0.
+
+    Returns:
+        generator: words in the order they were produced
+    """
+    feed = queue.Queue(maxsize)
+    done = object()
+
+    def produce():
+        try:
+            for w in words:
+                feed.put(w)
+        except:
+            logger.error("Background solver stopped", exc_info=True)
+        finally:
+            feed.put(done)
+
+    threading.Thread(target=produce, name="solver-stream", daemon=True).start()
+
+    def consume():
+        while True:
+            w = feed.get()
+            if w is done:
+                return
+            yield w
+    return consume()
+
+def invalid_words():
+    """Retrieves the words that squardle does not accept: proper nouns, banned guesses and inappropriate words.
+    Compiled in a single index (see exclusions), refreshable from https://squaredle.app/api/static/names-short.csv
+
+    Returns:
+        MappedWords: sorted invalid words, supports 'in'. Empty list if not available
+    """
+    try:
+        return EX.load_exclusions()
     except:
-        logger.error("Proper Nouns List not available")
+        logger.error("Invalid Words List not available", exc_info=True)
+        return []
+
+def exclude_invalid(words, invalid):
+    """Generator of the words that are not invalid"""
+    for w in words:
+        if w not in invalid:
+            yield w
+
+def _cache_stream(words, key:str, stats:dict, board:list):
+    """Pass the words through and store them in the solve cache with their paths once the stream is exhausted, if the search was complete (see board_solver_stream)."""
+    found = []
+    for w in words:
+        found.append(w)
+        yield w
+    if stats.get("complete"):
+        SC.put(key, found, verify_words(board, found))
 
-def squardle_solver(quick_solution = True, quick_list = []):
+class QuickExclusion:
+    """Words already searched by the quick pass: the quick lists and the words it found."""
+
+    def __init__(self, quick_dictionary, quick_list):
+        self.quick_dictionary = quick_dictionary
+        self.quick_list = set(quick_list)
+
+    def __contains__(self, word):
+        return word in self.quick_list or word in self.quick_dictionary
+
+    def __bool__(self):
+        return True
+
+def squardle_solver(quick_solution = True, quick_list = [], stream = False, setup = None, budget = None, cache = True, workers = 1, paths = False, word_lists = None):
     """ Retrieves all the necessary info of the day's board.
         Creates list of all words.
         Recursively find all possible words of the board
         Return all info necessary for Bot to execute.
+        Words are ranked by likelihood of acceptance by the caller (see word_ranking).
 
-        TODO: make a ranking of all words to increase accuracy and speed.
+    The long solution is incremental: it searches only the words of the million list that are not in the quick lists,
+    on the board compiled by the quick pass, and returns only words not already in quick_list.
+
+    Args:
+        quick_solution (bool, optional): Search the quick lists, else only the delta of the million list. Defaults to True.
+        quick_list (list, optional): Words found by the quick pass, not returned again by the long pass. Defaults to [].
+        stream (bool, optional): Search the board in a background thread and return the words as a stream, yielded as soon as they are found (see background_stream). Defaults to False.
+        setup (dict, optional): Puzzle config as given by board_parser.js_parser, so that it is fetched once for all the passes. Fetched if not given.
+        budget (float, optional): Seconds available to search the board, most promising branches first (see anytime_solver). Defaults to None, no limit.
+        cache (bool, optional): Read and store complete solutions in the on-disk solve cache (see solve_cache). Defaults to True.
+        workers (int, optional): Processes of the search when neither stream nor budget is given, e.g. WORKERS (see parallel_search, opt-in). Defaults to 1.
+        paths (bool, optional): Also return the path of every word found, read from the solve cache or traced once (see verify_words). Not with stream. Defaults to False.
+        word_lists (tuple, optional): quick and long dictionaries already open, e.g. kept warm by the daemon. Defaults to None, opened with dictionary_maker.
 
     Returns:
-        words found: list of words that could possibly work in the squardle board
+        words found: list of words that could possibly work in the squardle board. Generator of the words if stream
         bonus words: bonus word of the day. In case you want to put it at the end and avoid the pop up
-        invalid words: list of invalid words that squardle doesn't accept. Skip these if present in solution list. Also to avoid pop ups.
+        invalid words: words that squardle doesn't accept (see invalid_words), already removed from the words found.
+        paths: only if paths, dict of word: path of (row, column) of the words found
     """
+    failed = (0,0,0,0) if paths and not stream else (0,0,0)
     try:
-        setup = js_parser()
+        if setup is None:
+            setup = js_parser()
         board, bonus_word = day_setup(setup)
     except:
         logger.critical("Unable to get board of the day")
-        return 0,0,0
+        return failed
 
+    if word_lists is None:
+        word_lists = (dictionary_maker(mill_list=False), None if quick_solution else dictionary_maker(list1=False, json_l=False, mill_list=True))
     if quick_solution:
-        word_list = dictionary_maker(mill_list=False)
+        word_list = word_lists[0]
+        exclude = ()
         logger.info("Generation of Word List Optimized for Speed Completed")
     else:
-        word_list = dictionary_maker(list1=False, json_l=False, mill_list=True, given_word_list=quick_list)
+        word_list = word_lists[1]
+        exclude = QuickExclusion(word_lists[0], quick_list)
         logger.info("Generation of Word List optimized for Bonus Word Search Completed")
+    if cache:
+        try:
+            pass_key = "quick" if quick_solution else ("long", WS.fingerprint(exclude.quick_dictionary), WS.fingerprint(sorted(exclude.quick_list)))
+            key = SC.solve_key(board, WS.fingerprint(word_list), MIN_LENGHT, pass_key)
+            cached = SC.get(key)
+        except:
+            logger.warning("Solve cache not available", exc_info=True)
+            cache, cached = False, None
+        if cached is not None:
+            invalid = invalid_words()
+            solution = list(exclude_invalid(cached["words"], invalid))
+            if stream:
+                return iter(solution),bonus_word,invalid
+            if paths:
+                traced = cached.get("paths") or verify_words(board, solution)
+                return solution,bonus_word,invalid,{w: [tuple(cell) for cell in traced[w]] for w in solution if w in traced}
+            return solution,bonus_word,invalid
+    if stream:
+        logger.info("Board being solved in background")
+        stats = dict()
+        words = board_solver_stream(board,word_list,exclude=exclude,budget=budget,stats=stats)
+        if cache:
+            words = _cache_stream(words, key, stats, board)
+        invalid = invalid_words()
+        return background_stream(exclude_invalid(words, invalid)),bonus_word,invalid
     try:
         start = time()
-        solution = board_solver(board,word_list)
+        complete = True
+        if budget:
+            solution, stats = anytime_solver(board,word_list,budget,exclude=exclude)
+            complete = stats["complete"]
+        else:
+            solution = board_solver(board,word_list,workers=workers,exclude=exclude)
+        traced = verify_words(board, solution) if (cache and complete) or paths else dict()
+        if cache and complete:
+            SC.put(key, solution, traced)
         stop = time()
         if quick_solution:
             message = "Board Solved Optimized for Speed - time:{0}s".format(round(stop-start,2))
@@ -238,10 +795,12 @@ def squardle_solver(quick_solution = True, quick_list = []):
         logger.info(message)
     except:
         logger.critical("Unable to solve BoardSolver")
-        return 0,0,0
-    return list(solution),bonus_word,invalid_words()
+        return failed
+    invalid = invalid_words()
+    solution = list(exclude_invalid(solution, invalid))
+    if paths:
+        return solution,bonus_word,invalid,{w: traced[w] for w in solution if w in traced}
+    return solution,bonus_word,invalid
 
 
-# var gContractions = "'twas 'tween 'twere ain't aren't can't could've couldn't couldn't've daren't daresn't didn't doesn't don't everybody's everyone's had've hadn't hasn't haven't here's how'd how'll how're how's i'd've isn't it'll ma'am may've might've mightn't must've mustn't mustn't've needn't ne'er o'clock ought've oughtn't oughtn't've shan't she's should've shouldn't somebody's someone's something's that'd that'll there'd there'll there's they'd they'll they're they've wasn't we'd've we've weren't what'd what'll what're what's what've when'd when's where'd where'll where's where've which's which've who'd who'd've who'll who're who's who've why'd why're why's won't would've wouldn't wouldn't've y'all you'd you'll you're you've".split(" ");
-# var gBannedGuesses = "abos;amakwerekwere;arse;arses;arsing;asshole;baas;baases;backra;backras;bakra;bakras;ballbag;ballbags;ballsack;bastard;bastards;batshit;beaner;beaners;beastiality;bender;biatch;biatches;binghi;binghis;bint;bints;bitch;bitched;bitches;bitchiness;bitching;bitchy;blackamoor;blackamoors;blackfella;blackfellas;blowjob;boche;boches;bogtrotter;bogtrotters;bohunk;bohunks;bollock;bollocks;boner;boong;boonga;boongas;boongs;bosche;bosches;bossboy;bossboys;brushite;bubba;bubbas;buckra;buckras;buftie;bufties;bufty;bukkake;bulldike;bulldikes;bulldyke;bulldykes;bullshit;bullshits;bullshitted;bullshitter;bullshitters;bullshitting;bumboy;bumboys;buttmunch;buttplug;chickenshit;chickenshits;chinkie;chinkies;cholo;cholos;clit;cocksucker;cocksuckers;coolie;coolies;cooly;coon;coonshit;coonshits;copperskin;copperskins;cracka;crackas;crap;crapped;crapper;crapping;crip;crippledom;crippledoms;crips;cummed;cummer;cumming;cums;cumshot;cunt;cunts;cunty;dago;dagoes;dagos;darkey;darkeys;darkie;darkies;darky;dick;dicked;dicking;dicks;dikey;dikier;dikiest;dildo;dipshit;dipshits;dogan;dogans;douche;douchebag;douchebags;dyke;dykey;dykier;dykiest;faggeries;faggery;faggier;faggiest;fagging;faggot;faggotier;faggotiest;faggotries;faggotry;faggots;faggoty;faggy;fags;fatass;fatasses;fellate;fellatio;frig;frigged;frigging;frigs;fuck;fucked;fucker;fuckers;fuckface;fuckfaces;fuckhead;fuckheads;fucking;fuckoff;fuckoffs;fucks;fuckup;fuckups;fuckwit;fuckwits;fudgepacker;gammat;gammats;gangbang;gaylord;gaysex;ginzo;ginzoes;ginzos;gipped;gipping;gippo;gippoes;gippos;gips;gobshite;gobshites;golliwog;golliwogg;golliwoggs;golliwogs;gollywog;gollywogs;gook;gookeye;gookeyes;gooks;gooky;gookys;goyim;goyisch;goyish;goyishe;goys;gringa;gringas;gringo;gringos;guinea;gypo;gypos;gypped;gypper;gyppers;gypping;gyppo;gyppos;gyps;gypsied;gypsies;gypster;gypsters;gypsy;gypsying;haole;haoles;harelip;harelipped;harelips;hasbian;hasbians;hebe;hebes;hentai;honkey;honkeys;honkie;honkies;honky;hori;horis;horniest;horny;horseshit;horseshits;humping;hunkey;hunkeys;hunkie;hunkies;incest;incests;incestuous;incestuously;incestuousness;incestuousnesses;injun;injuns;jackoff;jerkoff ;jerries;jerry;jerrys;jesuit;jesuitic;jesuitical;jesuitically;jesuitism;jesuitisms;jesuitries;jesuitry;jesuits;jewboy;jewboys;jigaboo;jigaboos;jism;jizm ;jizz;kaffir;kaffirboom;kaffirbooms;kaffirs;kafir;kafirs;kanaka;kanakas;kike;kikes;knobhead;knobjocky;kraut;krauts;langer;langers;lesbo;lesbos;leses;lezes;lezz;lezza;lezzas;lezzes;lezzie;lezzies;lezzy;lubra;lubras;massa;massas;merde;mick;micks;mierda;mindfuck;mindfucked;mindfucks;minge;minges;moffie;moffies;mofo;mong;monged;mongol;mongolian;mongolism;mongolisms;mongoloid;mongoloids;mongols;mongs;motherfucker;motherfuckers;motherfucking;mulatress;mulatresses;mulatta;mulattas;mulatto;mulattoes;mulattos;mulattress;mulattresses;munt;munts;muntu;muntus;nance;nances;nancier;nancies;nanciest;nancified;nancy;neger;negress;negresses;negro;negroes;negrohead;negroheads;negroid;negroidal;negroids;negroism;negroisms;negrophil;negrophile;negrophiles;negrophilism;negrophilisms;negrophilist;negrophilists;negrophils;negrophobe;negrophobes;negrophobia;negrophobias;negros;nelly;nigga;niggah;nigger;niggerdom;niggerdoms;niggered;niggerhead;niggerheads;niggerier;niggeriest;niggering;niggerish;niggerism;niggerisms;niggerling;niggerlings;niggers;niggery;niglet;niglets;nitchie;nitchies;nonhandicapped;nonpapist;nonpapists;numbnuts;nutsack;nutsacks;octaroon;octaroons;octoroon;octoroons;ofay;ofays;papish;papisher;papishers;papishes;papism;papisms;papist;papistic;papistical;papistically;papistries;papistry;papists;peckerwood;peckerwoods;phonesex;picaninnies;picaninny;piccanin;piccaninnies;piccaninny;piccanins;pickaninnies;pickaninny;pickney;pickneys;pikey;pikeys;piss;polack;polacks;poofier;poofiest;poofs;pooftah;pooftahs;poofter;poofters;poofy;poove;pooveries;poovery;pooves;poovier;pooviest;poovy;poperies;popery;popish;popishly;porn;porno;pornographic;pornography;pornos;porns;pouftah;pouftahs;poufter;poufters;pube;pubes;pussies;pussy;quadroon;quadroons;quarteroon;quarteroons;quashee;quashees;quashie;quashies;queerdom;queerdoms;quintroon;quintroons;raghead;ragheads;rape;raped;rapes;raping;redneck;rednecked;rednecks;redskin;redskins;reffo;reffos;retard;retardate;retardates;retarded;retards;sakai;sakais;sambo;sambos;schizier;schiziest;schizo;schizos;schizy;schizzier;schizziest;schizzy;schvartze;schvartzes;schwartze;schwartzes;semimute;semimutes;shat;sheeney;sheeneys;sheenie;sheenies;shegetz;shemale;shemales;shicksa;shicksas;shiksa;shiksas;shikse;shikseh;shiksehs;shikses;shirtlifter;shirtlifters;shit;shitbag;shitbags;shitcan;shitcans;shite;shites;shitface;shitfaced;shitfaces;shithead;shitholes;shithteads;shitlist;shits;shitshole;shitstorm;shitstorms;shitte;shitted;shittier;shittiest;shittiness;shitting;shitty;shkotzim;shvartze;shvartzes;shylock;shylocks;skank;skanks;skanky;skimo;skimos;spastics;spaz;spazz;spazzed;spazzes;spazzing;spic;spick;spicks;spics;spik;spiks;squaw;squawman;squawmen;squaws;taig;taigs;thot;thots;tits;tittiefucker;titties;titty;towelhead;towelheads;trannie;trannies;tranny;twat;twinkie;twinkies;umlungu;umlungus;vendu;vendus;wang;wank;wanked;wanker;wankier;wankiest;wanking;wanks;wanky;welch;welched;welches;welching;welsh;welshed;welshes;welshing;wench;wetback;wetbacks;whitey;whiteys;whities;whore;wigga;wiggas;wigger;wiggers;willy;woggish;wogs;wooftah;wooftahs;woofter;woofters;yids;zambo;zambos".split(";"),
-#     gInappropriateWords = "asshole;ballsack;batshit;blowjob;boner;brushite;bukkake;bullshit;bullshits;bullshitted;bullshitter;bullshitters;bullshitting;buttmunch;buttplug;chickenshit;chickenshits;clit;coonshit;coonshits;cummer;cunt;cunts;cunty;dildo;dipshit;dipshits;fagging;faggot;fags;fellate;fellatio;frig;frigged;frigging;frigs;fuck;fucked;fucker;fuckers;fuckface;fuckfaces;fuckhead;fuckheads;fucking;fuckoff;fuckoffs;fucks;fuckup;fuckups;fuckwit;fuckwits;fudgepacker;gangbang;gaylord;gaysex;gobshite;gobshites;harelip;hentai;horniest;horny;horseshit;horseshits;jackoff;jerkoff ;jism;jizm ;jizz;knobhead;knobjocky;merde;mierda;mindfuck;mindfucked;mindfucks;mofo;motherfucker;motherfuckers;motherfucking;nigga;nigger;piss;porn;porno;pornographic;pornography;pornos;porns;pussies;pussy;shat;shit;shitbag;shitbags;shitcan;shitcans;shite;shites;shitface;shitfaced;shitfaces;shithead;shitholes;shithteads;shitlist;shits;shitshole;shitstorm;shitstorms;shitte;shitted;shittier;shittiest;shittiness;shitting;shitty;tittiefucker;titties;wang;wank;wanker;wankier;wankiest;wanky;wench;whore;willy".split(";");
\ No newline at end of file
+# var gContractions = "'twas 'tween 'twere ain't aren't can't could've couldn't couldn't've daren't daresn't didn't doesn't don't everybody's everyone's had've hadn't hasn't haven't here's how'd how'll how're how's i'd've isn't it'll ma'am may've might've mightn't must've mustn't mustn't've needn't ne'er o'clock ought've oughtn't oughtn't've shan't she's should've shouldn't somebody's someone's something's that'd that'll there'd there'll there's they'd they'll they're they've wasn't we'd've we've weren't what'd what'll what're what's what've when'd when's where'd where'll where's where've which's which've who'd who'd've who'll who're who's who've why'd why're why's won't would've wouldn't wouldn't've y'all you'd you'll you're you've".split(" ");
\ No newline at end of file
@@ -0,0 +1,116 @@
+""" Module encodes the compiled word list as NumPy arrays, so whole-dictionary filters run as vectorized operations.
+    codes:      uint8 matrix (words x longest word), letters a-z coded 1-26, any other character 27, padding 0
+    lengths:    uint16 vector of the lenghts of the words
+    histograms: uint8 matrix (words x 27), count of each letter a-z and of the other characters in every word, saturated at 255
+The arrays are saved next to the compiled artifact (see word_store) and loaded memory mapped.
+    """
+import numpy as np
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+PADDING = "`"       #character coded 0
+OTHER = 27          #code of any character that isn't a-z
+CHUNK = 200000      #words filtered at once, bounds the memory of the temporary arrays
+ARRAYS = ("codes", "lengths", "histograms")
+SATURATED = 255     #histogram count of a letter repeated 255 times or more, never available on a board (see fits_counts)
+
+def encode(words):
+    """Encode words as code matrix, lenghts and letter histograms.
+
+    Args:
+        words (list): sequence of words
+
+    Returns:
+        tuple: codes, lengths, histograms
+    """
+    lengths = np.fromiter((len(w) for w in words), dtype=np.uint16, count=len(words))
+    longest = int(lengths.max()) if len(words) else 1
+    text = "".join(w.ljust(longest, PADDING) for w in words).encode("ascii", errors="replace")
+    codes = np.frombuffer(text, dtype=np.uint8).reshape(len(words), longest) - ord(PADDING)
+    codes[codes > 26] = OTHER
+    histograms = np.zeros((len(words), OTHER+1), dtype=np.uint16)
+    rows = np.arange(len(words))
+    for column in range(longest):
+        histograms[rows, codes[:, column]] += 1
+    return codes, lengths, np.minimum(histograms[:, 1:], SATURATED).astype(np.uint8)
+
+def letter_codes(text:str):
+    """Codes of the letters of text"""
+    return np.array([ord(l)-ord(PADDING) if "a" <= l <= "z" else OTHER for l in text], dtype=np.uint8)
+
+class WordMatrix:
+    """Word list with its NumPy encoding. Filters return boolean masks over the words, select turns a mask back into words."""
+
+    def __init__(self, words, codes, lengths, histograms):
+        self.words = words
+        self.codes = codes
+        self.lengths = lengths
+        self.histograms = histograms
+
+    def __len__(self):
+        return len(self.words)
+
+    def min_length(self, size:int):
+        """Words of lenght size or more"""
+        return self.lengths >= size
+
+    def starts_with(self, prefix:str):
+        """Words beginning with prefix"""
+        if len(prefix) > self.codes.shape[1]:
+            return np.zeros(len(self), dtype=bool)
+        return (self.codes[:, :len(prefix)] == letter_codes(prefix)).all(axis=1)
+
+    def fits_counts(self, counts:dict):
+        """Words that don't need more copies of a letter than given in counts (letter: copies)"""
+        available = np.zeros(OTHER, dtype=np.uint8)
+        for letter, copies in counts.items():
+            if "a" <= letter <= "z":
+                available[ord(letter)-ord(PADDING)-1] = min(copies, SATURATED-1)
+        mask = np.empty(len(self), dtype=bool)
+        for start in range(0, len(self), CHUNK):
+            mask[start:start+CHUNK] = (self.histograms[start:start+CHUNK] <= available).all(axis=1)
+        return mask
+
+    def fits_bigrams(self, bigrams:set):
+        """Words whose consecutive letters are all in bigrams (set of two-letter strings)"""
+        allowed = np.zeros((OTHER+1, OTHER+1), dtype=bool)
+        allowed[:, 0] = True            #end of the word
+        for pair in bigrams:
+            a, b = letter_codes(pair)
+            allowed[a, b] = True
+        mask = np.empty(len(self), dtype=bool)
+        for start in range(0, len(self), CHUNK):
+            codes = self.codes[start:start+CHUNK]
+            mask[start:start+CHUNK] = allowed[codes[:, :-1], codes[:, 1:]].all(axis=1)
+        return mask
+
+    def select(self, mask):
+        """Words of the mask"""
+        return [self.words[i] for i in np.flatnonzero(mask)]
+
+def load_matrix(words):
+    """Open the NumPy encoding of a compiled word list (word_store.MappedWords), building and saving it first if missing or of an older layout.
+    Every array is written to a temporary file and moved in place, so an interrupted build never leaves a truncated array.
+
+    Returns:
+        WordMatrix: words and their memory mapped encoding
+    """
+    paths = [words.path.with_suffix(".{0}.npy".format(name)) for name in ARRAYS]
+    arrays = None
+    if all(p.exists() for p in paths):
+        try:
+            arrays = [np.load(p, mmap_mode="r") for p in paths]
+            if arrays[1].dtype != np.uint16 or len(arrays[1]) != len(words):
+                arrays = None
+        except:
+            logger.warning("Word matrix not readable", exc_info=True)
+            arrays = None
+    if arrays is None:
+        logger.info("Word matrix missing or out of date. Rebuilding")
+        for path, array in zip(paths, encode(words)):
+            temp = path.with_suffix(".tmp")
+            with open(temp, "wb") as f:
+                np.save(f, array)
+            temp.replace(path)
+        arrays = [np.load(p, mmap_mode="r") for p in paths]
+    return WordMatrix(words, *arrays)
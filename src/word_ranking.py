@@ -0,0 +1,113 @@
+""" Module ranks the words found by the solver by their likelihood of being accepted, so the high-yield words are typed first.
+The corpus is built from the official solutions of the past days (gYesterdayWords, see board_parser.previous_day):
+    official:   word: number of days it was an official solution
+    buckets:    bucket: [accepted, submitted], acceptance of the words we submitted on the past days, by list membership and lenght
+The score of a word is the smoothed acceptance of its bucket, raised towards 1 for every day the word was an official solution.
+    """
+import json
+import pathlib
+import Squardle.src.word_store as WS
+import Squardle.src.board_parser as BP
+import Squardle.src.rejected_words as RW
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+PATH = pathlib.Path(__file__).parent.parent.absolute()
+RANKING_PATH = PATH.joinpath("assets").joinpath("cache").joinpath("ranking.json")
+
+MAX_LENGTH = 10     #longer words share the bucket of MAX_LENGTH
+THRESHOLD = 0.0     #words scored below are not typed
+
+def _empty():
+    return {"days": [], "official": {}, "buckets": {}}
+
+def _load():
+    try:
+        with open(RANKING_PATH, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return _empty()
+    except:
+        logger.error("Ranking corpus unreadable", exc_info=True)
+        return _empty()
+
+def _save(data:dict):
+    RANKING_PATH.parent.mkdir(parents=True, exist_ok=True)
+    temp = RANKING_PATH.with_suffix(".tmp")
+    with open(temp, "w") as f:
+        json.dump(data, f)
+    temp.replace(RANKING_PATH)
+
+def bucket(word:str, quick_dictionary):
+    """Bucket of a word: membership in the quick lists and lenght"""
+    return "{0}:{1}".format(int(word in quick_dictionary), min(len(word), MAX_LENGTH))
+
+def record_day(setup:dict, quick_dictionary = None):
+    """Add yesterday's official solutions to the corpus, and the acceptance of the words submitted yesterday (see rejected_words.record_submissions).
+    Only the words we submitted count in the buckets: a word is accepted if official or accepted by the game (see rejected_words.accepted_words).
+    A day is recorded once.
+
+    Args:
+        setup (dict): puzzle config as given by board_parser.js_parser
+        quick_dictionary (optional): words of the quick lists. Defaults to the compiled quick lists.
+
+    Returns:
+        int: number of days in the corpus
+    """
+    data = _load()
+    board, bonus_word, words = BP.previous_day(setup)
+    date = setup.get(BP.YESTERDAY) if setup else None
+    if not words or date is None or date in data["days"]:
+        return len(data["days"])
+    if quick_dictionary is None:
+        quick_dictionary = WS.load_dictionary(mill_list=False)
+    official = set(words)
+    official.add(bonus_word)
+    for w in official:
+        data["official"][w] = data["official"].get(w, 0)+1
+    submitted = RW.submitted_words(date)
+    accepted = official.union(RW.accepted_words(date))
+    for w in submitted:
+        counts = data["buckets"].setdefault(bucket(w, quick_dictionary), [0, 0])
+        counts[0] += w in accepted
+        counts[1] += 1
+    data["days"].append(date)
+    _save(data)
+    message = "Ranking corpus: {0} days, {1} official words, {2} words submitted yesterday".format(len(data["days"]), len(data["official"]), len(submitted))
+    logger.info(message)
+    return len(data["days"])
+
+class Ranking:
+    """Acceptance scores of the words, from the corpus."""
+
+    def __init__(self, data:dict, quick_dictionary):
+        self.official = data["official"]
+        self.buckets = data["buckets"]
+        self.quick_dictionary = quick_dictionary
+
+    def score(self, word:str):
+        """Likelihood in [0,1] that word is accepted"""
+        accepted, submitted = self.buckets.get(bucket(word, self.quick_dictionary), (0, 0))
+        rate = (accepted+1)/(submitted+2)
+        return 1-(1-rate)/(1+self.official.get(word, 0))
+
+    def rank(self, words, threshold:float = THRESHOLD):
+        """Words sorted by descending score, without those scored below threshold"""
+        scored = [(self.score(w), w) for w in words]
+        ranked = [w for s, w in sorted(scored, key=lambda sw: (-sw[0], sw[1])) if s >= threshold]
+        message = "Ranked {0} words, {1} below threshold {2}".format(len(scored), len(scored)-len(ranked), threshold)
+        logger.debug(message)
+        return ranked
+
+def load_ranking(quick_dictionary = None):
+    """Ranking of the corpus recorded so far (see record_day). With an empty corpus every word scores 0.5.
+
+    Args:
+        quick_dictionary (optional): words of the quick lists. Defaults to the compiled quick lists.
+
+    Returns:
+        Ranking: scores of the words
+    """
+    if quick_dictionary is None:
+        quick_dictionary = WS.load_dictionary(mill_list=False)
+    return Ranking(_load(), quick_dictionary)
@@ -0,0 +1,230 @@
+""" Module compiles the word lists into a single binary artifact that can be memory mapped.
+The artifact is keyed by a content hash of the source lists, so it gets rebuilt automatically when one of them changes.
+
+Layout of the artifact (little endian):
+    header:     MAGIC, version, number of words (N)
+    offsets:    N+1 unsigned int, start of each word in the blob
+    blob:       sorted unique words, ascii encoded and packed one after the other
+    """
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from tqdm import tqdm
+from Luca.logger import LucaLogger
+logger = LucaLogger(__name__)
+
+PATH = pathlib.Path(__file__).parent.parent.absolute()
+WORD_PATH = PATH.joinpath("assets").joinpath("words")
+COMPILED_PATH = WORD_PATH.joinpath("compiled")
+HASHES_FILE = COMPILED_PATH.joinpath("hashes.json")     #size, modification time and hash of each source list
+
+MAGIC = b"SQDW"
+VERSION = 1
+HEADER = struct.Struct("<4sII")
+
+#file names of the source lists
+SOURCES = {"list1": "words_list.txt", "json_l": "json_list.txt", "mill_list": "wlist_match1.txt"}
+
+def temp_path(path):
+    """Unique temporary file next to path, to be moved in place with replace. Processes writing the same path at once never share it."""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, name = tempfile.mkstemp(dir=path.parent, prefix=".{0}.".format(path.name), suffix=".tmp")
+    os.close(handle)
+    return pathlib.Path(name)
+
+def _read_list(name:str):
+    """Read a source list. The million list is filtered to alphabetic words of lenght 4+."""
+    with open(WORD_PATH.joinpath(SOURCES[name]), "r") as f:
+        if name == "mill_list":
+            return [line.rstrip() for line in tqdm(f) if line.rstrip().isalpha() and len(line)>4]
+        return [line.rstrip() for line in tqdm(f)]
+
+def _file_hash(name:str, known:dict):
+    """Content hash of a source list. It's read and hashed only if its size or modification time changed since the hash in known."""
+    path = WORD_PATH.joinpath(SOURCES[name])
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return "missing"
+    key = [stat.st_size, stat.st_mtime_ns]
+    if known.get(name, {}).get("stat") == key:
+        return known[name]["hash"]
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    known[name] = {"stat": key, "hash": digest.hexdigest()}
+    return known[name]["hash"]
+
+def source_hash(selection:list):
+    """Content hash of the selected source lists. Missing lists are hashed as such.
+    The hash of each list is remembered in HASHES_FILE with its size and modification time, so unchanged lists are not read again.
+
+    Args:
+        selection (list): names of the selected lists, keys of SOURCES
+
+    Returns:
+        str: hex digest
+    """
+    try:
+        with open(HASHES_FILE, "r") as f:
+            known = json.load(f)
+    except:
+        known = dict()
+    before = json.dumps(known, sort_keys=True)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(struct.pack("<I", VERSION))
+    for name in selection:
+        digest.update(name.encode())
+        digest.update(_file_hash(name, known).encode())
+    if json.dumps(known, sort_keys=True) != before:
+        temp = None
+        try:
+            temp = temp_path(HASHES_FILE)
+            with open(temp, "w") as f:
+                json.dump(known, f)
+            temp.replace(HASHES_FILE)
+        except:
+            if temp is not None:
+                temp.unlink(missing_ok=True)
+            logger.warning("Unable to remember the hashes of the word lists", exc_info=True)
+    return digest.hexdigest()
+
+def artifact_path(selection:list):
+    """Path of the artifact for the selected lists at their current content."""
+    return COMPILED_PATH.joinpath("{0}-{1}.bin".format("+".join(selection), source_hash(selection)))
+
+def write_artifact(path, words:list):
+    """Pack a sorted list of unique words in the artifact format."""
+    blob = "".join(words).encode("ascii")
+    offsets = array("I", [0])
+    position = 0
+    for w in words:
+        position += len(w)
+        offsets.append(position)
+    if offsets.itemsize != 4:
+        raise TypeError("Unsupported array itemsize for offsets")
+    temp = temp_path(path)
+    try:
+        with open(temp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(words)))
+            f.write(offsets.tobytes())
+            f.write(blob)
+        temp.replace(path)
+    except:
+        temp.unlink(missing_ok=True)
+        raise
+
+def compile_dictionary(selection:list):
+    """Read the selected lists, merge them and write the artifact. Stale artifacts of the same selection (and files derived from them) are removed.
+    Several processes may compile the same selection at once (e.g. both passes of the bot): each writes its own temporary file,
+    and an artifact already written by another process is kept as it is.
+
+    Args:
+        selection (list): names of the selected lists, keys of SOURCES
+
+    Returns:
+        pathlib.Path: path of the compiled artifact
+    """
+    words = set()
+    for name in selection:
+        try:
+            words.update(_read_list(name))
+            message = "{0} List Uploaded".format(SOURCES[name])
+            logger.debug(message)
+        except:
+            message = "{0} List not available".format(SOURCES[name])
+            logger.warning(message)
+    words = sorted(w for w in words if w.isascii())
+    path = artifact_path(selection)
+    for stale in COMPILED_PATH.glob("{0}-*".format("+".join(selection))):
+        if not stale.name.startswith(path.stem+"."):
+            stale.unlink(missing_ok=True)
+    if path.exists():
+        message = "Dictionary {0} already compiled by another process".format(path.name)
+        logger.info(message)
+        return path
+    write_artifact(path, words)
+    message = "Compiled dictionary of {0} words in {1}".format(len(words), path.name)
+    logger.info(message)
+    return path
+
+class MappedWords:
+    """Read-only sorted sequence of words backed by a memory mapped artifact.
+    Words are decoded only when accessed. Membership tests are binary searches."""
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("Not a compiled dictionary: {0}".format(self.path))
+        self._size = size
+        start = HEADER.size
+        self._offsets = memoryview(self._map)[start:start+4*(size+1)].cast("I")
+        self._blob = start+4*(size+1)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._size))]
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        return self._map[self._blob+self._offsets[i]:self._blob+self._offsets[i+1]].decode("ascii")
+
+    def __iter__(self):
+        offsets = self._offsets
+        data = self._map[self._blob:].decode("ascii")
+        for i in range(self._size):
+            yield data[offsets[i]:offsets[i+1]]
+
+    def __contains__(self, word):
+        i = bisect_left(self, word)
+        return i < self._size and self[i] == word
+
+    def __repr__(self):
+        return "MappedWords({0}, {1} words)".format(self.path.name, self._size)
+
+def load_dictionary(list1 = True, json_l = True, mill_list = True):
+    """Open the compiled artifact of the selected lists, compiling it first if missing or out of date.
+
+    Returns:
+        MappedWords: sorted unique words
+    """
+    selection = [name for name,selected in zip(SOURCES, (list1, json_l, mill_list)) if selected]
+    path = artifact_path(selection)
+    if not path.exists():
+        logger.info("Compiled dictionary missing or out of date. Rebuilding")
+        path = compile_dictionary(selection)
+    return MappedWords(path)
+
+def fingerprint(dictionary):
+    """Identifier of the content of a dictionary: the name of its compiled artifact (which carries the content hash), or a hash of the words.
+
+    Args:
+        dictionary: MappedWords, dawg.Dawg or any iterable of words
+
+    Returns:
+        str: fingerprint
+    """
+    path = getattr(dictionary, "path", None)
+    if path is not None:
+        return pathlib.Path(path).name
+    digest = hashlib.blake2b(digest_size=16)
+    for w in dictionary:
+        digest.update(w.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()